@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from GeneticAlgorithm import (genetic_algorithm, fitness, create_initial_population, tournament_selection,
+                              roulette_wheel_selection, POP_SIZE, MAX_GENERATIONS, MUTATION_RATE, GRID_SIZE)
+from LifeEngine import ENGINES, get_engine
+
+# Reproducible benchmark suite of the Game of Life engines and the genetic algorithm
+#
+#   python Benchmark.py --output bench.json                 run everything and write the results
+#   python Benchmark.py --save-baseline baseline.json       store the results as the baseline
+#   python Benchmark.py --baseline baseline.json            compare with the baseline, exit code 1 on regression
+#
+# Every result has a name like "step/numpy/soup/512", a value, a unit and whether higher is better.
+# The sizes of a workload are run in increasing order, once a size takes more than --budget seconds
+# the larger ones are skipped (the pure Python engines can't step a 2048x2048 grid in reasonable time).
+# Every measurement starts with a warm-up call (which also fills the memo of HashLife) and keeps the fastest of
+# several rounds (--repeats), which leaves out the first-call costs and most of the noise of a busy machine.
+
+STEP_SIZES = [30, 128, 512, 2048]
+SELECTION_SIZES = [100, 1000, 10000, 100000]
+FITNESS_SEEDS = [1, 2, 3]
+GA_POPULATION_SIZES = [POP_SIZE, 10 * POP_SIZE]
+MEASURE_ROUNDS = 3
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.json")
+
+
+def result(name, value, unit, higher_is_better):
+    return {"name": name, "value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+# Grids used by the step benchmark: a random soup filling the grid, or a 5x5 seed like the GA creates
+def make_grid(pattern, size, seed=0):
+    rng = np.random.default_rng(seed)
+    if pattern == "soup":
+        return (rng.random((size, size)) < 0.3).astype(np.uint8).tolist()
+    cells = np.zeros((size, size), dtype=np.uint8)
+    start = size // 2 - 2
+    cells[start:start + 5, start:start + 5] = rng.random((5, 5)) < 0.5
+    return cells.tolist()
+
+
+# After a warm-up call, run fn in 'rounds' rounds of min_time / rounds seconds (at least one call each),
+# return the number of calls and the elapsed time of the fastest round
+def measure(fn, min_time, rounds=MEASURE_ROUNDS):
+    fn()
+    best = None
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / rounds:
+                break
+        if best is None or elapsed / calls < best[1] / best[0]:
+            best = (calls, elapsed)
+    return best
+
+
+def bench_step(engines, sizes, min_time, rounds, budget):
+    results = []
+    for engine_name in engines:
+        engine = get_engine(engine_name)
+        for pattern in ("soup", "seed"):
+            for size in sizes:
+                state = engine.from_grid(make_grid(pattern, size))
+                holder = [state]
+
+                def run():
+                    holder[0] = engine.step(holder[0])
+
+                calls, elapsed = measure(run, min_time, rounds)
+                results.append(result(f"step/{engine_name}/{pattern}/{size}", calls * size * size / elapsed, "cell_updates/s", True))
+                if elapsed / calls > budget:
+                    break
+    return results
+
+
+def bench_fitness(engines, max_generations, min_time, rounds):
+    with open(SAMPLE_PATH) as f:
+        grids = {"sample": json.load(f)}
+    for seed in FITNESS_SEEDS:
+        random.seed(seed)
+        grids[f"seed{seed}"] = create_initial_population(1, GRID_SIZE)[0]
+    results = []
+    for engine_name in engines:
+        for grid_name, grid in grids.items():
+            calls, elapsed = measure(lambda: fitness(grid, max_generations, engine_name), min_time, rounds)
+            results.append(result(f"fitness/{engine_name}/{grid_name}", elapsed / calls, "s", False))
+    return results
+
+
+def bench_selection(sizes, min_time, rounds, budget):
+    results = []
+    for selection in (tournament_selection, roulette_wheel_selection):
+        for size in sizes:
+            rng = random.Random(size)
+            population = list(range(size))
+            fitness_scores = [(rng.randint(0, MAX_GENERATIONS), rng.randint(0, 200), (0, 0, 0)) for _ in range(size)]
+            random.seed(size)
+            calls, elapsed = measure(lambda: selection(population, fitness_scores), min_time, rounds)
+            results.append(result(f"selection/{selection.__name__}/{size}", elapsed / calls, "s", False))
+            if elapsed / calls > budget:
+                break
+    return results
+
+
+# The fastest of 'repeats' runs after a warm-up run, a size whose warm-up is slower than budget is only run once
+# more and skips the larger populations
+def bench_genetic_algorithm(engines, population_sizes, max_generations, repeats, budget):
+    results = []
+    for engine_name in engines:
+        for population_size in population_sizes:
+            def run():
+                start = time.perf_counter()
+                genetic_algorithm(population_size, GRID_SIZE, max_generations, 10, MUTATION_RATE, engine=engine_name, seed=1)
+                return time.perf_counter() - start
+
+            slow = run() > budget
+            timings = [run() for _ in range(1 if slow else repeats)]
+            results.append(result(f"genetic_algorithm/{engine_name}/{population_size}", min(timings), "s", False))
+            if slow:
+                break
+    return results
+
+
+# Compare results with a baseline, a result is a regression when it is worse by more than tolerance
+def compare(results, baseline, tolerance):
+    baseline = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        reference = baseline.get(entry["name"])
+        if reference is None or reference["value"] == 0:
+            continue
+        ratio = entry["value"] / reference["value"]
+        worse = ratio < 1 - tolerance if entry["higher_is_better"] else ratio > 1 + tolerance
+        entry["baseline"] = reference["value"]
+        entry["ratio"] = ratio
+        if worse:
+            regressions.append(entry)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Game of Life engines and the genetic algorithm.")
+    parser.add_argument("--workloads", nargs="+", choices=["step", "fitness", "selection", "ga"], default=["step", "fitness", "selection", "ga"])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and shorter measurements, for a smoke run")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum measuring time of a step, fitness or selection result")
+    parser.add_argument("--repeats", type=int, default=MEASURE_ROUNDS,
+                        help="measuring rounds of every result (runs for the genetic algorithm), the fastest is kept")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds after which the larger sizes of a workload are skipped")
+    parser.add_argument("--max-generations", type=int, default=MAX_GENERATIONS)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results stored in this JSON file")
+    parser.add_argument("--save-baseline", help="store the results as a baseline in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    step_sizes, selection_sizes, ga_population_sizes = STEP_SIZES, SELECTION_SIZES, GA_POPULATION_SIZES
+    if args.quick:
+        step_sizes, selection_sizes, ga_population_sizes = STEP_SIZES[:2], SELECTION_SIZES[:2], GA_POPULATION_SIZES[:1]
+        args.min_time = min(args.min_time, 0.05)
+        args.budget = min(args.budget, 1.0)
+
+    results = []
+    if "step" in args.workloads:
+        results += bench_step(args.engines, step_sizes, args.min_time, args.repeats, args.budget)
+    if "fitness" in args.workloads:
+        results += bench_fitness(args.engines, args.max_generations, args.min_time, args.repeats)
+    if "selection" in args.workloads:
+        results += bench_selection(selection_sizes, args.min_time, args.repeats, args.budget)
+    if "ga" in args.workloads:
+        results += bench_genetic_algorithm(args.engines, ga_population_sizes, args.max_generations, args.repeats, args.budget)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    for entry in results:
+        line = f"{entry['name']:<45} {entry['value']:>12.4g} {entry['unit']}"
+        if "ratio" in entry:
+            line += f"  ({entry['ratio']:.2f}x baseline)"
+        if entry in regressions:
+            line += "  REGRESSION"
+        print(line)
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
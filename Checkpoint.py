@@ -0,0 +1,122 @@
+import os
+import pickle
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+# Checkpoints of the genetic algorithm, so a long run can be interrupted and resumed
+# A checkpoint holds everything the next generations depend on: the population (packed 8 cells per byte),
+# its fitness scores, the best chromosome and its fitness, the fitness histories and the state of the random
+# module (the selections derive their NumPy generators from it), so a resumed run gives bit for bit the results
+# of an uninterrupted one. It is written as an uncompressed .npz file through a temporary file, an interrupted
+# save never corrupts the previous checkpoint.
+# Evaluators whose state changes the next scores (a NoveltyArchive, a FitnessBudget) are attached to the checkpoint
+# by name, their state() is saved with it and given back to their restore() when the run resumes.
+
+CHECKPOINT_VERSION = 1
+
+# generation is the number of genetic algorithm generations done, finished is True once the run is over
+CheckpointState = namedtuple("CheckpointState", ["parameters", "generation", "finished", "population", "fitness_scores",
+                                                 "best_chromosome", "best_fitness", "avg_fitness_graph_data",
+                                                 "best_fitness_graph_data", "random_state", "evaluation_state"],
+                             defaults=[{}])
+
+
+class Checkpoint:
+    def __init__(self, path, interval=1):
+        if interval < 1:
+            raise ValueError(f"Checkpoint interval must be at least 1, got {interval}")
+        self.path = path
+        self.interval = interval
+        self.evaluators = {}
+
+    def attach(self, name, evaluator):
+        self.evaluators[name] = evaluator
+
+    # State of the attached evaluators, by name
+    def evaluation_state(self):
+        return {name: evaluator.state() for name, evaluator in self.evaluators.items()}
+
+    # Give the attached evaluators their saved state (an evaluator missing from the checkpoint keeps its state)
+    def restore_evaluation_state(self, evaluation_state):
+        for name, evaluator in self.evaluators.items():
+            if name in evaluation_state:
+                evaluator.restore(evaluation_state[name])
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # True when a checkpoint is written after this number of generations
+    def due(self, generation):
+        return generation % self.interval == 0
+
+    def save(self, state):
+        population = np.stack([np.asarray(grid, dtype=np.uint8) for grid in state.population])
+        version, internal_state, gauss_next = state.random_state
+        arrays = {
+            "version": np.array([CHECKPOINT_VERSION]),
+            "parameters": np.array(state.parameters, dtype=np.float64),
+            "progress": np.array([state.generation, state.finished], dtype=np.int64),
+            "shape": np.array(population.shape, dtype=np.int64),
+            "population": np.packbits(population),
+            "fitness_scores": _scores_to_array(state.fitness_scores),
+            "best_chromosome": np.asarray(state.best_chromosome, dtype=np.uint8),
+            "best_fitness": _scores_to_array([state.best_fitness]),
+            "avg_fitness_graph_data": np.array(state.avg_fitness_graph_data, dtype=np.int64),
+            "best_fitness_graph_data": np.array(state.best_fitness_graph_data, dtype=np.int64),
+            "random_version": np.array([version], dtype=np.int64),
+            "random_state": np.array(internal_state, dtype=np.uint32),
+            "random_gauss": np.array([np.nan if gauss_next is None else gauss_next], dtype=np.float64),
+            "evaluation_state": np.frombuffer(pickle.dumps(state.evaluation_state), dtype=np.uint8),
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load(self):
+        with np.load(self.path) as data:
+            if int(data["version"][0]) != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version {int(data['version'][0])} in {self.path}")
+            shape = tuple(int(n) for n in data["shape"])
+            count = int(np.prod(shape))
+            population = np.unpackbits(data["population"], count=count).reshape(shape)
+            generation, finished = (int(n) for n in data["progress"])
+            gauss_next = float(data["random_gauss"][0])
+            random_state = (int(data["random_version"][0]), tuple(int(n) for n in data["random_state"]),
+                            None if np.isnan(gauss_next) else gauss_next)
+            # checkpoints written before the evaluators were saved have no evaluation state
+            evaluation_state = pickle.loads(data["evaluation_state"].tobytes()) if "evaluation_state" in data else {}
+            return CheckpointState(
+                parameters=tuple(data["parameters"].tolist()),
+                generation=generation,
+                finished=bool(finished),
+                population=population,
+                fitness_scores=_scores_from_array(data["fitness_scores"]),
+                best_chromosome=data["best_chromosome"],
+                best_fitness=_scores_from_array(data["best_fitness"])[0],
+                avg_fitness_graph_data=data["avg_fitness_graph_data"].tolist(),
+                best_fitness_graph_data=data["best_fitness_graph_data"].tolist(),
+                random_state=random_state,
+                evaluation_state=evaluation_state)
+
+    # Check that a checkpoint belongs to a run with these parameters
+    def check_parameters(self, state, parameters):
+        if tuple(float(value) for value in parameters) != state.parameters:
+            raise ValueError(f"Checkpoint {self.path} was written by a run with other parameters "
+                             f"{state.parameters}, expected {tuple(parameters)}")
+
+
+# Fitness tuples (generations, max_diff, (initial_alive_cells, final_alive_cells, max_diff_gen)) as an (N, 5) array
+def _scores_to_array(fitness_scores):
+    return np.array([(score[0], score[1]) + tuple(score[2]) for score in fitness_scores], dtype=np.int64).reshape(-1, 5)
+
+
+def _scores_from_array(array):
+    return [(int(row[0]), int(row[1]), (int(row[2]), int(row[3]), int(row[4]))) for row in array]
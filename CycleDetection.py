@@ -0,0 +1,116 @@
+# Cycle detection for Game of Life simulations
+# A grid "stabilizes" at the first generation that repeats an earlier one, the repeated configuration
+# starts the cycle (cycle_start) and the number of generations between the two is the period
+# (period 1 is a still life, a dead grid is also a still life)
+
+CYCLE_DETECTIONS = ["hash", "brent", "jump"]
+
+
+# Remembers a fixed-size digest of every visited generation instead of a full copy of the grid,
+# memory is DIGEST_SIZE bytes (plus the dict overhead) per generation whatever the grid size
+class HashCycleDetector:
+    def __init__(self, engine):
+        self.engine = engine
+        self.seen = {}
+        self.cycle_start = None
+        self.period = None
+
+    # Record the state of the given generation, return True if it repeats an earlier generation
+    def visit(self, state, generation):
+        state_digest = self.engine.digest(state)
+        first_generation = self.seen.get(state_digest)
+        if first_generation is not None:
+            self.cycle_start = first_generation
+            self.period = generation - first_generation
+            return True
+        self.seen[state_digest] = generation
+        return False
+
+
+# Brent's cycle detection, keeping only O(1) grids in memory
+# Steps the grid from generation 0 for at most max_steps generations, calling on_step(generation, state) for
+# every generation computed (a generation can be computed past the first repeat, but never twice)
+# Returns (cycle_start, period, cycle_state) where cycle_state is the grid at cycle_start,
+# or (None, None, None) if no cycle was found within max_steps generations
+def find_cycle_brent(engine, state, max_steps, on_step=None):
+    if max_steps < 1:
+        return None, None, None
+    power = period = 1
+    tortoise = state
+    tortoise_key = engine.key(tortoise)
+    hare = engine.step(state)
+    generation = 1
+    if on_step is not None:
+        on_step(generation, hare)
+    # Find the period: the tortoise waits at generations 2^k - 1 while the hare runs up to 2^k generations ahead
+    while engine.key(hare) != tortoise_key:
+        if generation >= max_steps:
+            return None, None, None
+        if power == period:
+            tortoise, tortoise_key = hare, engine.key(hare)
+            power *= 2
+            period = 0
+        hare = engine.step(hare)
+        generation += 1
+        period += 1
+        if on_step is not None:
+            on_step(generation, hare)
+
+    # Find the start of the cycle: walk two grids 'period' generations apart from generation 0 until they meet
+    tortoise = hare = state
+    for _ in range(period):
+        hare = engine.step(hare)
+    cycle_start = 0
+    while engine.key(tortoise) != engine.key(hare):
+        tortoise = engine.step(tortoise)
+        hare = engine.step(hare)
+        cycle_start += 1
+    return cycle_start, period, tortoise
+
+
+# Cycle detection for engines able to jump ahead (engine.advance, e.g. HashLife), without simulating every generation
+# Looks for a cycle the grid is in at generation last_generation: the period is found by stepping that grid
+# until it comes back (at most max_period generations). Then the start of the cycle is the first generation g
+# with grid(g) == grid(g + period), which stays true once the grid is in the cycle: it is searched first among
+# checkpoints every 'stride' generations, then inside the interval before the first checkpoint in the cycle
+# Returns (cycle_start, period), or (None, None) if the grid isn't in a cycle of period <= max_period
+def find_cycle_jump(engine, state, last_generation, max_period, stride):
+    checkpoints = [state]
+    while len(checkpoints) * stride <= last_generation:
+        checkpoints.append(engine.advance(checkpoints[-1], stride))
+    last_state = engine.advance(checkpoints[-1], last_generation - (len(checkpoints) - 1) * stride)
+    last_key = engine.key(last_state)
+    period = None
+    probe = last_state
+    for generations in range(1, max_period + 1):
+        probe = engine.step(probe)
+        if engine.key(probe) == last_key:
+            period = generations
+            break
+    if period is None:
+        return None, None
+
+    def in_cycle(cycle_state):
+        return engine.key(cycle_state) == engine.key(engine.advance(cycle_state, period))
+
+    low, high = 0, len(checkpoints)
+    while low < high:
+        middle = (low + high) // 2
+        if in_cycle(checkpoints[middle]):
+            high = middle
+        else:
+            low = middle + 1
+    first = low
+    if first == 0:
+        return 0, period
+    # the cycle starts after the checkpoint before, at the latest at the next checkpoint (or at last_generation)
+    base_generation = (first - 1) * stride
+    base = checkpoints[first - 1]
+    low, high = 1, stride if first < len(checkpoints) else last_generation - base_generation
+    while low < high:
+        middle = (low + high) // 2
+        if in_cycle(engine.advance(base, middle)):
+            high = middle
+        else:
+            low = middle + 1
+    return base_generation + low, period
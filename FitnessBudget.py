@@ -0,0 +1,171 @@
+import math
+
+import numpy as np
+
+from GeneticAlgorithm import BatchSimulation, reachable_cells
+
+# Budgeted fitness evaluation: the grids which clearly can't compete stop before max_generations
+# The population is simulated by successive halving: every grid runs up to a first horizon (min_generations,
+# max_generations / 8 by default), then only the best 1/reduction of the grids still running (ranked by max_diff so
+# far) go on to a horizon 'reduction' times longer, and so on up to max_generations. Between two horizons a grid
+# also stops when:
+#   - even filling every cell its live cells can reach by max_generations wouldn't beat the best max_diff known
+#   - it stayed quiet for quiet_generations generations (at most quiet_population live cells within a
+#     quiet_size x quiet_size box) while it was behind the best max_diff known
+# budget caps the generations simulated per evaluation (per generation of the genetic algorithm): the first horizon
+# shrinks so that every grid fits in it, then fewer grids are promoted once the budget runs low, and the grids left
+# when it is spent stop.
+# A grid which died or stabilized gets its exact score, a stopped grid the score of its simulation so far, so its
+# max_diff is a lower bound. The grids with the best max_diff returned so far are remembered and never simulated
+# again, so the best chromosome of the genetic algorithm never loses its score.
+# A persisted FitnessCache shouldn't be shared with runs without a budget, it would keep these lower bounds, and as
+# the cache isn't part of checkpoints, a budgeted run with a cache only resumes exactly when the cache is empty.
+
+
+class FitnessBudget:
+    def __init__(self, budget=None, reduction=2, min_generations=None, quiet_generations=32, quiet_size=6,
+                 quiet_population=12):
+        if budget is not None and budget < 1:
+            raise ValueError(f"Budget must be at least 1 generation, got {budget}")
+        if reduction < 2:
+            raise ValueError(f"Reduction must be at least 2, got {reduction}")
+        self.budget = budget
+        self.reduction = reduction
+        self.min_generations = min_generations
+        self.quiet_generations = quiet_generations
+        self.quiet_size = quiet_size
+        self.quiet_population = quiet_population
+        # best max_diff returned so far, and the scores of the grids which reached it
+        self.best_max_diff = 0
+        self.best = {}
+        self.evaluated = 0
+        self.simulated_generations = 0
+        self.max_saved_generations = 0
+        self.stopped = {"bound": 0, "quiet": 0, "halving": 0, "budget": 0}
+
+    # Generations at which the grids still running are ranked, the last one is max_generations
+    def horizons(self, max_generations):
+        horizon = max(1, self.min_generations or max_generations // 8)
+        horizons = []
+        while horizon < max_generations:
+            horizons.append(horizon)
+            horizon *= self.reduction
+        return horizons + [max_generations]
+
+    def key(self, grid, max_generations):
+        cells = np.asarray(grid, dtype=np.uint8)
+        return cells.shape, np.packbits(cells).tobytes(), max_generations
+
+    # Evaluate a population, the scores are returned in the order of the population
+    # the engine must be batched, genetic_algorithm checks it before the run (see check_budget_options)
+    def evaluate(self, population, max_generations, engine=None):
+        keys = [self.key(grid, max_generations) for grid in population]
+        scores = [self.best.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if not missing:
+            return scores
+
+        simulation = BatchSimulation([population[i] for i in missing], max_generations, engine)
+        stopped = np.zeros(len(simulation), dtype=bool)
+        quiet = np.zeros(len(simulation), dtype=np.int64)
+        best_max_diff = self.best_max_diff
+
+        def on_step(running, alive_cells):
+            states = simulation.states[running]
+            rows, cols = states.any(axis=2), states.any(axis=1)
+            height = rows.shape[1] - np.argmax(rows[:, ::-1], axis=1) - np.argmax(rows, axis=1)
+            width = cols.shape[1] - np.argmax(cols[:, ::-1], axis=1) - np.argmax(cols, axis=1)
+            is_quiet = ((alive_cells > 0) & (alive_cells <= self.quiet_population) & (height <= self.quiet_size)
+                        & (width <= self.quiet_size) & (simulation.max_diff[running] < best_max_diff))
+            quiet[running] = np.where(is_quiet, quiet[running] + 1, 0)
+            stop = quiet[running] >= self.quiet_generations
+            self._stop(stopped, running[stop], "quiet")
+            return stop
+
+        horizons = self.horizons(max_generations)
+        running = np.arange(len(simulation))
+        if self.budget is not None:
+            # the first horizon shrinks until every grid fits in the budget, without budget for a generation
+            # of every grid only the first ones are simulated
+            first = min(horizons[0], self.budget // len(simulation))
+            if first == 0:
+                self._stop(stopped, running[self.budget:], "budget")
+                running = running[:self.budget]
+                first = 1
+            horizons = [first] + [horizon for horizon in horizons if horizon > first]
+        rung = 0
+        while True:
+            horizon = horizons[rung]
+            simulation.run(running, horizon, on_step)
+            running = simulation.running(running)
+            running = running[~stopped[running]]
+            if rung == len(horizons) - 1 or running.size == 0:
+                break
+            # the max_diff reached by any grid is a score to beat
+            best_max_diff = max(best_max_diff, int(simulation.max_diff.max()))
+
+            # no cell farther than the remaining generations from a live cell can come alive
+            remaining = max_generations - horizon
+            bounds = np.array([reachable_cells(simulation.states[i], remaining) for i in running])
+            hopeless = np.maximum(bounds - simulation.initial_alive_cells[running], simulation.max_diff[running]) < best_max_diff
+            self._stop(stopped, running[hopeless], "bound")
+            running = running[~hopeless]
+
+            # successive halving, the first of equal max_diff first
+            promoted = math.ceil(running.size / self.reduction)
+            affordable = promoted
+            if self.budget is not None:
+                left = self.budget - int(simulation.generations.sum())
+                affordable = min(promoted, left // (horizons[rung + 1] - horizon))
+                if affordable == 0 and left > 0:
+                    # the best grid spends what is left of the budget
+                    affordable = 1
+                    horizons = horizons[:rung + 1] + [horizon + left]
+            order = running[np.argsort(-simulation.max_diff[running], kind="stable")]
+            self._stop(stopped, order[affordable:promoted], "budget")
+            self._stop(stopped, order[promoted:], "halving")
+            running = np.sort(order[:affordable])
+            rung += 1
+
+        self.evaluated += len(simulation)
+        self.simulated_generations += int(simulation.generations.sum())
+        # upper bound of the generations saved: the stopped grids would have run at most until max_generations,
+        # many would have stabilized before
+        self.max_saved_generations += int((max_generations - simulation.generations[stopped]).sum())
+        for i, score in zip(missing, simulation.scores()):
+            scores[i] = score
+            self._remember(keys[i], score)
+        return scores
+
+    def _stop(self, stopped, indices, reason):
+        stopped[indices] = True
+        self.stopped[reason] += len(indices)
+
+    def _remember(self, key, score):
+        if score[1] > self.best_max_diff:
+            self.best_max_diff = score[1]
+            self.best = {}
+        if score[1] == self.best_max_diff and score[1] > 0:
+            self.best[key] = score
+
+    # Best scores and counters, for checkpoints
+    def state(self):
+        return {"best_max_diff": self.best_max_diff, "best": dict(self.best), "evaluated": self.evaluated,
+                "simulated_generations": self.simulated_generations,
+                "max_saved_generations": self.max_saved_generations, "stopped": dict(self.stopped)}
+
+    def restore(self, state):
+        self.best_max_diff = state["best_max_diff"]
+        self.best = dict(state["best"])
+        self.evaluated = state["evaluated"]
+        self.simulated_generations = state["simulated_generations"]
+        self.max_saved_generations = state["max_saved_generations"]
+        self.stopped = dict(state["stopped"])
+
+    def stats(self):
+        return {
+            "evaluated": self.evaluated,
+            "simulated_generations": self.simulated_generations,
+            "max_saved_generations": self.max_saved_generations,
+            "stopped": dict(self.stopped),
+        }
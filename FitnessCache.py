@@ -0,0 +1,107 @@
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Bounded LRU cache of fitness scores
+# The genetic algorithm evaluates the same grids again and again (the elite is kept every generation,
+# mutations can flip no cell, selection duplicates the winners), the cache skips all these simulations.
+# Grids are keyed by their live cells bounding box packed 8 cells per byte, together with the grid shape,
+# the position of the box and max_generations. The position is needed because the border of the grid is dead,
+# so the same pattern can behave differently near an edge; with translation_invariant=True the position is
+# dropped and patterns are only compared up to translation, which is faster to hit but approximate.
+# With a path the cache is loaded from it when created and written back by save().
+class FitnessCache:
+    def __init__(self, maxsize=100000, path=None, translation_invariant=False):
+        self.maxsize = maxsize
+        self.path = path
+        self.translation_invariant = translation_invariant
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, grid, max_generations):
+        cells = np.array(grid, dtype=np.uint8)
+        rows, cols = np.nonzero(cells)
+        if rows.size == 0:
+            return cells.shape, None, None, b"", max_generations
+        top, left = int(rows.min()), int(cols.min())
+        box = cells[top:rows.max() + 1, left:cols.max() + 1]
+        position = None if self.translation_invariant else (top, left)
+        return cells.shape, position, box.shape, np.packbits(box).tobytes(), max_generations
+
+    # Return the cached score for the key or None, counting hits and misses
+    def get(self, key):
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        self.entries[key] = score
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    # Evaluate a population through the cache: evaluate(grids) is only called once, on the distinct grids
+    # missing from the cache, and the scores are returned in the order of the population
+    def evaluate(self, population, max_generations, evaluate):
+        keys = [self.key(grid, max_generations) for grid in population]
+        scores = [self.get(key) for key in keys]
+        missing = OrderedDict()
+        for i, score in enumerate(scores):
+            if score is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            new_scores = evaluate([population[indexes[0]] for indexes in missing.values()])
+            for (key, indexes), score in zip(missing.items(), new_scores):
+                self.put(key, score)
+                for i in indexes:
+                    scores[i] = score
+            # the duplicates of a missing grid were evaluated only once
+            duplicates = sum(len(indexes) - 1 for indexes in missing.values())
+            self.hits += duplicates
+            self.misses -= duplicates
+        return scores
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            entries = pickle.load(f)
+        for key, score in entries:
+            self.put(key, score)
+
+    # Write the cache to its file, through a temporary file so an interrupted save never corrupts it
+    def save(self, path=None):
+        path = path or self.path
+        if path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(list(self.entries.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -1,73 +1,331 @@
 import random
-import copy
 import math
+import os
+import hashlib
+from collections import namedtuple
+from functools import partial
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
-# Function to count live neighbors of a cell
-def count_live_neighbors(grid, x, y):
-    directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-    count = 0
-    grid_size = len(grid)
-    for dx, dy in directions:
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < grid_size and 0 <= ny < grid_size:
-            count += grid[ny][nx]
-    return count
-
-# Function to simulate one step of the Game of Life
-def step(grid):
-    grid_size = len(grid)
-    new_grid = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
-    for y in range(grid_size):
-        for x in range(grid_size):
-            live_neighbors = count_live_neighbors(grid, x, y)
-            if grid[y][x] == 1:
-                if live_neighbors in [2, 3]:
-                    new_grid[y][x] = 1
-            else:
-                if live_neighbors == 3:
-                    new_grid[y][x] = 1
-    return new_grid
+import numpy as np
+
+from Grid import Grid, copy_grid
+from LifeEngine import DIGEST_SIZE, count_live_neighbors, get_engine
+from Metrics import EvaluationCounter, GenerationTimer
+from CycleDetection import CYCLE_DETECTIONS, HashCycleDetector, find_cycle_brent, find_cycle_jump
+from Population import ArrayPopulation, ListPopulation
+from Checkpoint import Checkpoint, CheckpointState
+
+# Default parameters of the genetic algorithm
+POP_SIZE = 10
+MAX_GENERATIONS = 400
+GENERATIONS_UNTIL_STOP = 20
+MUTATION_RATE = 0.5
+GRID_SIZE = 30
+
+# Function to simulate one step of the Game of Life on a list of lists grid
+# the actual work is done by the selected engine (NumPy by default)
+def step(grid, engine=None):
+    engine = get_engine(engine)
+    return engine.to_grid(engine.step(engine.from_grid(grid)))
+
+# Result of simulating a grid until it stabilizes or reaches max_generations
+# generations is the number of simulated generations (not zeroed for invalid solutions as in fitness)
+# cycle_start and period describe the detected cycle, both are None when the grid didn't stabilize
+Simulation = namedtuple("Simulation", ["generations", "max_diff", "initial_alive_cells", "final_alive_cells",
+                                       "max_diff_gen", "cycle_start", "period"])
+
+# Generations jumped at once by the coarse pass of the "jump" cycle detection, and longest period it looks for
+JUMP_STRIDE = 64
+JUMP_MAX_PERIOD = 1024
+
+# Simulate a grid until it repeats an earlier generation or reaches max_generations
+# cycle_detection is "hash" (keep a small digest of every generation), "brent"
+# (keep O(1) grids, at the price of simulating up to 3 times more generations) or "jump"
+# (for engines that can jump ahead like HashLife, exact as long as the period is at most JUMP_MAX_PERIOD)
+def simulate(grid, max_generations, engine=None, cycle_detection="hash"):
+    if cycle_detection not in CYCLE_DETECTIONS:
+        raise ValueError(f"Unknown cycle detection '{cycle_detection}', expected one of {CYCLE_DETECTIONS}")
+    engine = get_engine(engine)
+    state = engine.from_grid(grid)
+    if cycle_detection == "brent":
+        return _simulate_brent(engine, state, max_generations)
+    if cycle_detection == "jump":
+        return _simulate_jump(engine, state, max_generations)
 
-# Fitness function: we maximize the number of generations before the grid stabilizes or dies
-# and also maximize the number of live cells at the end minus at the beginning
-# seen feature is added to recognize the stabilization of the grid
-def fitness(grid, max_generations):
     generations = 0
-    seen = set()
-    
+    detector = HashCycleDetector(engine)
+
     # Count the number of live cells at the start
-    initial_alive_cells = sum(sum(row) for row in grid)
+    initial_alive_cells = engine.population(state)
     max_diff = 0
     max_diff_gen = 0
     while generations < max_generations:
-        grid_tuple = tuple(tuple(row) for row in grid)
-        if grid_tuple in seen:
+        if detector.visit(state, generations):
             break
-        seen.add(grid_tuple)
-        grid = step(grid)
+        state = engine.step(state)
         generations += 1
 
-        alive_cells = sum(sum(row) for row in grid)
+        alive_cells = engine.population(state)
         # updating the max size of the Metuselah
         if alive_cells - initial_alive_cells > max_diff:
             max_diff = alive_cells - initial_alive_cells
             max_diff_gen = generations
 
-
     # Count the number of live cells at the end
-    final_alive_cells = sum(sum(row) for row in grid)
-    
+    final_alive_cells = engine.population(state)
+    return Simulation(generations, max_diff, initial_alive_cells, final_alive_cells, max_diff_gen,
+                      detector.cycle_start, detector.period)
+
+# Same simulation as above using Brent's cycle detection
+# the first repeat happens at generation cycle_start + period, every generation simulated after it
+# repeats one of the cycle, so it can't improve max_diff and the final grid is the one at cycle_start
+def _simulate_brent(engine, state, max_generations):
+    initial_alive_cells = engine.population(state)
+    stats = {"max_diff": 0, "max_diff_gen": 0, "final_alive_cells": initial_alive_cells}
+
+    def on_step(generation, new_state):
+        if generation > max_generations:
+            return
+        alive_cells = engine.population(new_state)
+        if alive_cells - initial_alive_cells > stats["max_diff"]:
+            stats["max_diff"] = alive_cells - initial_alive_cells
+            stats["max_diff_gen"] = generation
+        if generation == max_generations:
+            stats["final_alive_cells"] = alive_cells
+
+    # a cycle repeating before max_generations is always found within 3 * max_generations + 1 generations
+    cycle_start, period, cycle_state = find_cycle_brent(engine, state, 3 * max_generations + 1, on_step)
+    if cycle_start is not None and cycle_start + period < max_generations:
+        return Simulation(cycle_start + period, stats["max_diff"], initial_alive_cells, engine.population(cycle_state),
+                          stats["max_diff_gen"], cycle_start, period)
+    return Simulation(max_generations, stats["max_diff"], initial_alive_cells, stats["final_alive_cells"],
+                      stats["max_diff_gen"], None, None)
+
+# Same simulation as above for engines that jump ahead (engine.advance), in time logarithmic in max_generations
+# The stabilization generation comes from find_cycle_jump. The peak population is found in two passes over
+# the simulated generations cut in JUMP_STRIDE long intervals: a coarse pass jumps from interval to interval
+# and samples the population at their ends, a refine pass then only simulates generation by generation the
+# intervals that may hold the peak. A cell can't come alive before the activity of the closest live cell
+# reaches it, one cell per generation, which bounds the population inside each interval.
+def _simulate_jump(engine, state, max_generations, stride=JUMP_STRIDE, max_period=JUMP_MAX_PERIOD):
+    if not hasattr(engine, "advance"):
+        raise ValueError(f"Engine '{engine.name}' can't jump ahead, use the hashlife engine")
+    initial_alive_cells = engine.population(state)
+    if max_generations <= 0:
+        return Simulation(0, 0, initial_alive_cells, initial_alive_cells, 0, None, None)
+
+    # generations are checked for repeats up to max_generations - 1, as in simulate
+    cycle_start, period = find_cycle_jump(engine, state, max_generations - 1, max_period, stride)
+    if cycle_start is None or cycle_start + period > max_generations - 1:
+        cycle_start = period = None
+        generations = max_generations
+    else:
+        generations = cycle_start + period
+
+    # coarse pass
+    intervals = []
+    interval_state = state
+    lower_bound = 0
+    for start in range(0, generations, stride):
+        span = min(stride, generations - start)
+        intervals.append((start, span, interval_state))
+        interval_state = engine.advance(interval_state, span)
+        lower_bound = max(lower_bound, engine.population(interval_state) - initial_alive_cells)
+    final_alive_cells = engine.population(interval_state)
+
+    # refine pass
+    grid_cells = np.array(engine.to_grid(state), dtype=np.uint8)
+    size = len(grid_cells)
+    max_diff = 0
+    max_diff_gen = 0
+    for start, span, interval_state in intervals:
+        cells = grid_cells if start == 0 else np.array(engine.to_grid(interval_state), dtype=np.uint8)
+        upper_bound = reachable_cells(cells[:, :size], span) - initial_alive_cells
+        if upper_bound <= max_diff or upper_bound < lower_bound:
+            continue
+        for generation in range(start + 1, start + span + 1):
+            interval_state = engine.step(interval_state)
+            alive_cells = engine.population(interval_state)
+            # updating the max size of the Metuselah
+            if alive_cells - initial_alive_cells > max_diff:
+                max_diff = alive_cells - initial_alive_cells
+                max_diff_gen = generation
+
+    return Simulation(generations, max_diff, initial_alive_cells, final_alive_cells, max_diff_gen, cycle_start, period)
+
+# Number of cells at most 'distance' cells away (in both directions) from a live cell
+def reachable_cells(cells, distance):
+    rows, cols = cells.shape
+    if not cells.any():
+        return 0
+    prefix = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+    prefix[1:, 1:] = cells.cumsum(axis=0).cumsum(axis=1)
+    top = np.clip(np.arange(rows) - distance, 0, rows)
+    bottom = np.clip(np.arange(rows) + distance + 1, 0, rows)
+    left = np.clip(np.arange(cols) - distance, 0, cols)
+    right = np.clip(np.arange(cols) + distance + 1, 0, cols)
+    live_around = (prefix[np.ix_(bottom, right)] - prefix[np.ix_(top, right)]
+                   - prefix[np.ix_(bottom, left)] + prefix[np.ix_(top, left)])
+    return int((live_around > 0).sum())
+
+# Fitness function: we maximize the number of generations before the grid stabilizes or dies
+# and also maximize the number of live cells at the end minus at the beginning
+# the stabilization of the grid is recognized by the cycle detection of simulate
+def fitness(grid, max_generations, engine=None, cycle_detection="hash"):
+    simulation = simulate(grid, max_generations, engine, cycle_detection)
+    generations = simulation.generations
+
     # The fitness is the difference between the final and initial live cells, along with generations
 
     #(initial_alive_cells, final_alive_cells) is a tuple of the number of live cells at the start and end
     # Ensure we only return valid fitness when max_diff > 0
-    if max_diff == 0:
+    if simulation.max_diff == 0:
         generations = 0  # Indicate invalid solution
-    return generations, max_diff, (initial_alive_cells, final_alive_cells, max_diff_gen)
+    return generations, simulation.max_diff, (simulation.initial_alive_cells, simulation.final_alive_cells, simulation.max_diff_gen)
+
+# Batched simulation of a population: the grids are stacked into one (pop, N, N) array and advanced together
+# by a batched engine (NumPy by default), each grid keeps its own set of digests and stops on its own
+# run() advances any subset of the grids up to a generation, so the simulation of every grid can be resumed
+# later or cut short (see FitnessBudget.py), running all of them to max_generations is batch_fitness
+class BatchSimulation:
+    def __init__(self, population, max_generations, engine=None):
+        self.engine = get_engine(engine)
+        self.max_generations = max_generations
+        grid_size = len(population[0])
+        # Count the number of live cells at the start, exactly as fitness does
+        cells = [self.engine.from_grid(grid) for grid in population]
+        self.initial_alive_cells = np.array([self.engine.population(state) for state in cells], dtype=np.int64)
+        self.states = np.stack([state[:, :grid_size] for state in cells])
+        population_size = len(population)
+
+        self.generations = np.zeros(population_size, dtype=np.int64)
+        self.max_diff = np.zeros(population_size, dtype=np.int64)
+        self.max_diff_gen = np.zeros(population_size, dtype=np.int64)
+        self.final_alive_cells = self.initial_alive_cells.copy()
+        # grids which came back to a configuration they already visited, their simulation is complete
+        self.stabilized = np.zeros(population_size, dtype=bool)
+        self.seen = [set() for _ in range(population_size)]
+        self.shape_bytes = np.array(self.states.shape[1:], dtype=np.int64).tobytes()
+
+    def __len__(self):
+        return len(self.states)
+
+    # Grids among indices which are neither stabilized nor at max_generations
+    def running(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        return indices[~self.stabilized[indices] & (self.generations[indices] < self.max_generations)]
+
+    # Advance the grids of indices until generation 'until' (max_generations by default) or until they stabilize
+    # on_step(running, alive_cells) is called after every step with the grids just advanced and their live cells,
+    # it can return a mask of these grids to stop here
+    def run(self, indices, until=None, on_step=None):
+        until = self.max_generations if until is None else min(until, self.max_generations)
+        grid_cells = self.states.shape[1] * self.states.shape[2]
+        running = np.asarray(indices, dtype=np.int64)
+        while True:
+            running = running[~self.stabilized[running] & (self.generations[running] < until)]
+            # stop every grid that came back to a configuration it already visited
+            packed = np.packbits(self.states[running].reshape(running.size, grid_cells), axis=1)
+            for i, packed_state in zip(running, packed):
+                state_digest = hashlib.blake2b(self.shape_bytes + packed_state.tobytes(), digest_size=DIGEST_SIZE).digest()
+                if state_digest in self.seen[i]:
+                    self.stabilized[i] = True
+                else:
+                    self.seen[i].add(state_digest)
+            running = running[~self.stabilized[running]]
+            if running.size == 0:
+                break
+
+            self.states[running] = self.engine.step(self.states[running])
+            self.generations[running] += 1
+
+            alive_cells = self.states[running].reshape(running.size, -1).sum(axis=1, dtype=np.int64)
+            self.final_alive_cells[running] = alive_cells
+            # updating the max size of the Metuselah for every running grid
+            diff = alive_cells - self.initial_alive_cells[running]
+            improved = diff > self.max_diff[running]
+            self.max_diff[running[improved]] = diff[improved]
+            self.max_diff_gen[running[improved]] = self.generations[running[improved]]
+
+            # a grid which just died repeats at the next generation (unless it was already empty at the start)
+            died = running[(alive_cells == 0) & (self.initial_alive_cells[running] > 0)]
+            if died.size:
+                self.generations[died] += self.generations[died] < self.max_generations
+                self.stabilized[died] = True
+            if on_step is not None:
+                running = running[~on_step(running, alive_cells)]
+
+    # Fitness scores of the grids, as fitness computes them
+    def scores(self, indices=None):
+        indices = range(len(self)) if indices is None else indices
+        # Ensure we only return valid fitness when max_diff > 0
+        return [(int(self.generations[i]) if self.max_diff[i] else 0, int(self.max_diff[i]),
+                 (int(self.initial_alive_cells[i]), int(self.final_alive_cells[i]), int(self.max_diff_gen[i])))
+                for i in indices]
+
+# Batched fitness function: the whole population is simulated at once by a BatchSimulation
+# the results are the same as calling fitness on each grid
+def batch_fitness(population, max_generations, engine=None):
+    if len(population) == 0:
+        return []
+    simulation = BatchSimulation(population, max_generations, engine)
+    simulation.run(range(len(simulation)))
+    return simulation.scores()
+
+# Compact encoding used to ship grids to worker processes: the shape and the cells packed 8 per byte
+def encode_grid(grid):
+    cells = np.array(grid, dtype=np.uint8)
+    return cells.shape, np.packbits(cells).tobytes()
+
+def decode_grid(encoded_grid):
+    shape, packed = encoded_grid
+    cells = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=shape[0] * shape[1])
+    return cells.reshape(shape).tolist()
+
+# Worker task: evaluate one chunk of encoded grids
+def _evaluate_chunk(encoded_grids, max_generations, engine, cycle_detection):
+    return evaluate_population([decode_grid(encoded) for encoded in encoded_grids], max_generations, engine,
+                               cycle_detection=cycle_detection)
+
+# Executors available to evaluate the population
+EXECUTORS = {
+    "serial": None,
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+# Create the executor used to evaluate the population, None means evaluating serially in this process
+def create_executor(executor="serial", workers=None):
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}', expected one of {sorted(EXECUTORS)}")
+    executor_class = EXECUTORS[executor]
+    if executor_class is None:
+        return None
+    return executor_class(max_workers=workers or os.cpu_count())
+
+# Evaluate the fitness of every chromosome in the population
+# batched engines simulate the whole population at once, other engines fall back to one grid at a time
+# with an executor the population is split into 'workers' contiguous chunks evaluated in parallel,
+# fitness is deterministic and the chunks are gathered in order, so the scores don't depend on the number of workers
+# Brent's cycle detection is only available one grid at a time
+def evaluate_population(population, max_generations, engine=None, executor=None, workers=1, cycle_detection="hash"):
+    if executor is not None and len(population) > 1:
+        # engines are sent by name, every worker uses its own instance
+        engine_name = get_engine(engine).name
+        chunk_size = math.ceil(len(population) / max(1, workers))
+        chunks = [[encode_grid(grid) for grid in population[i:i + chunk_size]] for i in range(0, len(population), chunk_size)]
+        futures = [executor.submit(_evaluate_chunk, chunk, max_generations, engine_name, cycle_detection) for chunk in chunks]
+        return [score for future in futures for score in future.result()]
+
+    engine = get_engine(engine)
+    if getattr(engine, "batched", False) and cycle_detection == "hash":
+        return batch_fitness(population, max_generations, engine)
+    return [fitness(chromosome, max_generations, engine, cycle_detection) for chromosome in population]
 
 # Function to create an initial population of grids
 # each inital configuration will contain a random 5x5 grid with 0s and 1s
-def create_initial_population(population_size, grid_size, initial_alive_cells=5):
+# with packed=True the grids are bit-packed Grid objects instead of lists of lists
+def create_initial_population(population_size, grid_size, initial_alive_cells=5, packed=False):
     population = []
     for _ in range(population_size):
         grid = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
@@ -76,72 +334,64 @@ def create_initial_population(population_size, grid_size, initial_alive_cells=5)
         for y in range(start_y, start_y + initial_alive_cells):
             for x in range(start_x, start_x + initial_alive_cells):
                 grid[y][x] = random.choice([0, 1])
-        population.append(grid)
+        population.append(Grid.from_list(grid) if packed else grid)
     return population
 
+# NumPy random generator seeded from the random module, so seeding random also makes the selections reproducible
+def _selection_rng():
+    return np.random.default_rng(random.getrandbits(64))
+
 # Selection function using tournament selection method
-# Selects the best individual from a random subset of the population
-def tournament_selection(population, fitness_scores, tournament_size=3):
-    selected = []
-    # Repeat the tournament selection process to select the entire population
-    for _ in range(len(population)):
-        # Randomly select 'tournament_size' number (3) of individuals from the given population
-        # and sort them based on their fitness scores
-        if len(population) >= tournament_size:
-            tournament = sorted(list(zip(population, fitness_scores)), key=lambda x: x[1][0], reverse=True)
-            # Select the winner of the tournament based on the maximum fitness score
-            winner = max(tournament, key=lambda x: x[1])[0]
-            selected.append(winner)
-        else:
-            for chromosome in population:
-                selected.append(chromosome)
-            break
-    return selected
+# Every one of the len(population) tournaments samples 'tournament_size' random individuals (with replacement)
+# and selects the one with the best fitness score, comparing the whole fitness tuples.
+# The population is ranked once (O(N log N)) and all the tournaments are drawn at once
+# with return_indices=True the indices of the selected individuals are returned instead of the individuals
+def tournament_selection(population, fitness_scores, tournament_size=3, return_indices=False):
+    population_size = len(population)
+    if population_size < tournament_size:
+        indices = np.arange(population_size)
+    else:
+        ranks = np.empty(population_size, dtype=np.int64)
+        ranks[sorted(range(population_size), key=lambda i: fitness_scores[i])] = np.arange(population_size)
+        contestants = _selection_rng().integers(0, population_size, size=(population_size, tournament_size))
+        indices = contestants[np.arange(population_size), np.argmax(ranks[contestants], axis=1)]
+    if return_indices:
+        return indices.tolist()
+    return [population[i] for i in indices]
 
 # Selection function using roulette wheel selection method
-# Selects individuals based on their fitness scores
-
-def roulette_wheel_selection(population, fitness_scores):
-    selected = []
+# Selects individuals based on their fitness ranking: ranking by max_diff (1 is the worst, N is the best),
+# the probability of an individual is proportional to rank ** bias_factor
+# every selection is a binary search in the cumulative distribution, so the whole selection is O(N log N)
+# with return_indices=True the indices of the selected individuals are returned instead of the individuals
+def roulette_wheel_selection(population, fitness_scores, bias_factor=2, return_indices=False):
     population_size = len(population)
-    
+    if population_size == 0:
+        return []
+
     # Rank individuals by fitness (ascending order, worst to best)
-    sorted_population = sorted(zip(population, fitness_scores), key=lambda x: x[1][1])
-    
-    # Assign ranks (1 is the worst, N is the best)
-    ranks = list(range(1, population_size + 1))
-    
-    # Calculate rank-based probabilities
-    total_rank = sum(ranks)
-    probabilities = [rank / total_rank for rank in ranks]
-    
-    # Apply a bias for top ranks 
-    # using 2 as the bias factor, but can be adjusted
-    bias_factor = 2 
-    probabilities = [p ** bias_factor for p in probabilities]
-    
-    # Normalize probabilities
-    total_prob = sum(probabilities)
-    probabilities = [prob / total_prob for prob in probabilities]
-    
+    sorted_indices = np.array(sorted(range(population_size), key=lambda i: fitness_scores[i][1]), dtype=np.int64)
+
+    # Apply a bias for top ranks, using 2 as the bias factor by default
+    probabilities = np.arange(1, population_size + 1, dtype=np.float64) ** bias_factor
+
     # Create cumulative distribution
-    cumulative_probabilities = [sum(probabilities[:i+1]) for i in range(len(probabilities))]
-    
+    cumulative_probabilities = np.cumsum(probabilities)
+
     # Perform selection
-    for _ in range(population_size):
-        random_number = random.uniform(0, 1)
-        for i, cumulative_prob in enumerate(cumulative_probabilities):
-            if random_number <= cumulative_prob:
-                selected.append(sorted_population[i][0])
-                break
-    
-    return selected
+    random_numbers = _selection_rng().random(population_size) * cumulative_probabilities[-1]
+    positions = np.minimum(np.searchsorted(cumulative_probabilities, random_numbers), population_size - 1)
+    indices = sorted_indices[positions]
+    if return_indices:
+        return indices.tolist()
+    return [population[i] for i in indices]
 
 
-def crossover(parent1, parent2):
+def crossover(parent1, parent2, in_place=False):
     """
     Perform crossover by replacing between 1 to 5 rows from the bottom of parent1
     with rows from parent2, starting at the first row containing at least one '1'.
+    With in_place=True the rows are replaced in parent1 itself instead of a copy.
     """
     rows = len(parent1)
     
@@ -160,7 +410,7 @@ def crossover(parent1, parent2):
     num_rows = random.randint(1, min(5, rows - start_row))
     
     # Perform the row replacement
-    child = [row[:] for row in parent1]  # Create a copy of parent1
+    child = parent1 if in_place else copy_grid(parent1)  # Create a copy of parent1
     for i in range(num_rows):
         if start_row + i < rows:
             child[start_row + i] = parent2[start_row + i]
@@ -172,7 +422,12 @@ def crossover(parent1, parent2):
 # relying on the mutation rate and 1's amount to decide how many cells to flip
 def mutate(grid, MUTATION_RATE):
     grid_size = len(grid)
-    ones_positions = [(y, x) for y in range(grid_size) for x in range(grid_size) if grid[y][x] == 1]
+    if isinstance(grid, Grid):
+        ones_positions = [(y, x) for y, x in grid.live_cells() if x < grid_size]
+    elif isinstance(grid, np.ndarray):
+        ones_positions = [tuple(position) for position in np.argwhere(grid[:, :grid_size] == 1).tolist()]
+    else:
+        ones_positions = [(y, x) for y in range(grid_size) for x in range(grid_size) if grid[y][x] == 1]
     for _ in range(random.randint(0, int(MUTATION_RATE * len(ones_positions)))):
         if random.random() > 0.5 and ones_positions:
             y, x = random.choice(ones_positions)
@@ -182,98 +437,287 @@ def mutate(grid, MUTATION_RATE):
             grid[y][x] = 1
     return grid
 
+# A FitnessBudget simulates the population itself, on a batched engine in this process with the hash cycle detection
+def check_budget_options(engine=None, executor="serial", cycle_detection="hash"):
+    engine = get_engine(engine)
+    if not getattr(engine, "batched", False):
+        raise ValueError(f"Budgeted evaluation needs a batched engine, '{engine.name}' isn't")
+    if executor not in (None, "serial"):
+        raise ValueError(f"Budgeted evaluation runs serially, it can't use the executor {executor!r}")
+    if cycle_detection != "hash":
+        raise ValueError(f"Budgeted evaluation uses the hash cycle detection, not '{cycle_detection}'")
+
 # Main function for the genetic algorithm
-def genetic_algorithm(population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE):
+# executor selects how the fitness of the population is evaluated: "serial", "thread", "process"
+# or an already running concurrent.futures.Executor, with 'workers' workers (defaults to the number of CPUs)
+# seed makes the run reproducible, the results do not depend on the executor or the number of workers
+# cycle_detection is passed to fitness ("hash" or "brent")
+# cache is an optional FitnessCache, grids found in it are not simulated again (it is saved at the end if it has a path)
+# budget is an optional FitnessBudget, the weak grids are then only partly simulated (see FitnessBudget.py),
+# on a batched engine in this process with the hash cycle detection (see check_budget_options), its best scores
+# are saved in the checkpoint
+# novelty is an optional NoveltyArchive, the near-duplicates of the chromosomes already evaluated are not simulated
+# (see Novelty.py), the archive is saved in the checkpoint
+# packed=True evolves bit-packed Grid chromosomes (the best chromosome is then returned as a Grid)
+# progress is an optional callable receiving the metrics of every generation (see Metrics.py)
+# checkpoint is an optional path (or Checkpoint) written every checkpoint_interval generations and at the end of the run,
+# when it already exists the run resumes from it, with the same results as if it was never interrupted
+# migration is an optional callable migration(generation, population) called after every generation,
+# which can replace chromosomes of the population (see Islands.py)
+# on_generation is an optional callable on_generation(generation, best_chromosome, best_fitness) called after every generation
+# cancel is an optional callable checked before every generation, when it returns True the run stops and returns the
+# best chromosome found so far (its checkpoint, if any, can still be resumed)
+def genetic_algorithm(population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE, engine=None,
+                      executor="serial", workers=None, seed=None, cycle_detection="hash", cache=None, packed=False,
+                      progress=None, checkpoint=None, checkpoint_interval=1, migration=None, on_generation=None, cancel=None,
+                      novelty=None, budget=None):
+    if budget is not None:
+        check_budget_options(engine, executor, cycle_detection)
+    if seed is not None:
+        random.seed(seed)
+    if checkpoint is not None and not isinstance(checkpoint, Checkpoint):
+        checkpoint = Checkpoint(checkpoint, checkpoint_interval)
+    if checkpoint is not None and novelty is not None:
+        checkpoint.attach("novelty", novelty)
+    if checkpoint is not None and budget is not None:
+        checkpoint.attach("budget", budget)
+    pool = executor if isinstance(executor, Executor) else create_executor(executor, workers)
+    if budget is not None:
+        evaluate = partial(budget.evaluate, max_generations=max_generations, engine=engine)
+    else:
+        evaluate = partial(evaluate_population, max_generations=max_generations, engine=engine, executor=pool,
+                           workers=workers or os.cpu_count(), cycle_detection=cycle_detection)
+    counter = None
+    if progress is not None:
+        evaluate = counter = EvaluationCounter(evaluate, grid_size)
+    if cache is not None:
+        evaluate = partial(cache.evaluate, max_generations=max_generations, evaluate=evaluate)
+    if novelty is not None:
+        evaluate = partial(novelty.evaluate, max_generations=max_generations, evaluate=evaluate)
+    try:
+        return _evolve(_Run(population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE, packed,
+                            evaluate, progress=progress, counter=counter, cache=cache, checkpoint=checkpoint,
+                            migration=migration, on_generation=on_generation, cancel=cancel))
+    finally:
+        if pool is not None and pool is not executor:
+            pool.shutdown()
+        if cache is not None:
+            cache.save()
+
+# The configuration of one run and its hooks, shared by _evolve, _resume and _generations
+# evaluate(population) returns the fitness scores of a population, counter is the EvaluationCounter reporting to progress
+class _Run:
+    def __init__(self, population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE, packed,
+                 evaluate, progress=None, counter=None, cache=None, checkpoint=None, migration=None, on_generation=None,
+                 cancel=None):
+        self.max_generations = max_generations
+        self.stabilization_generations = stabilization_generations
+        self.MUTATION_RATE = MUTATION_RATE
+        self.packed = packed
+        self.parameters = (population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE, packed)
+        # the population grows by at most one chromosome (the best one) per generation
+        self.capacity = population_size + stabilization_generations + 1
+        self.evaluate = evaluate
+        self.progress = progress
+        self.counter = counter
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.migration = migration
+        self.on_generation = on_generation
+        self.cancel = cancel
+        self.timer = GenerationTimer() if progress is not None else None
+        # cache stats to compare the next generation with
+        self.cache_stats = None
+
+    # The time since the previous lap is counted in the phase, when the metrics are reported
+    def lap(self, phase):
+        if self.timer is not None:
+            self.timer.lap(phase)
+
+    def start_cache_stats(self):
+        if self.timer is not None and self.cache is not None:
+            self.cache_stats = self.cache.stats()
+
+    # Send the metrics of one generation to progress
+    def report(self, generation, population_size, best_fitness, average_fitness):
+        timer, counter, cache = self.timer, self.counter, self.cache
+        evaluation_seconds = timer.timings.get("evaluation", 0.0)
+        record = {
+            "generation": generation,
+            "population_size": population_size,
+            "best_fitness": best_fitness,
+            "average_fitness": average_fitness,
+            "selection_seconds": timer.timings.get("selection", 0.0),
+            "variation_seconds": timer.timings.get("variation", 0.0),
+            "evaluation_seconds": evaluation_seconds,
+            "on_generation_seconds": timer.timings.get("on_generation", 0.0),
+            "migration_seconds": timer.timings.get("migration", 0.0),
+            "checkpoint_seconds": timer.timings.get("checkpoint", 0.0),
+            "evaluated": counter.evaluated,
+            "cell_updates_per_second": counter.cell_updates / evaluation_seconds if evaluation_seconds > 0 else 0.0,
+        }
+        counter.reset()
+        if cache is not None:
+            new_stats = cache.stats()
+            hits = new_stats["hits"] - self.cache_stats["hits"]
+            lookups = hits + new_stats["misses"] - self.cache_stats["misses"]
+            record["cache_hit_rate"] = hits / lookups if lookups else 0.0
+            self.cache_stats = new_stats
+        self.progress(record)
+        timer.timings.clear()
+        timer.lap("reporting")
+
+    def save_checkpoint(self, generation, finished, population, best_chromosome, best_fitness, avg_fitness_graph_data,
+                        best_fitness_graph_data):
+        checkpoint = self.checkpoint
+        checkpoint.save(CheckpointState(self.parameters, generation, finished, population.grids(), population.scores(),
+                                        best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data,
+                                        random.getstate(), checkpoint.evaluation_state()))
+
+# The genetic algorithm loop itself
+# the chromosomes live in a double-buffered population store (see Population.py), addressed by index
+def _evolve(run):
+    if run.checkpoint is not None and run.checkpoint.exists():
+        return _resume(run)
+
     # Generate initial random population, each grid is a 2D array of 0s and 1s
-    population = create_initial_population(population_size, grid_size)
+    population_size, grid_size = run.parameters[:2]
+    initial_population = create_initial_population(population_size, grid_size, packed=run.packed)
+    if run.packed:
+        population = ListPopulation(initial_population, run.capacity)
+    else:
+        population = ArrayPopulation(initial_population, run.capacity)
+    run.lap("variation")
+    run.start_cache_stats()
 
     avg_fitness_graph_data = []  # List to store averagefitness over generations
     best_fitness_graph_data = []  # List to store best fitness over generations
 
     # Calculate fitness scores for each grid, using game of life simulation for each grid
     # returns a tuple of (generations, alive_cells), for each grid
-    fitness_scores = []
-    for chromosome in population:
-        curr_fitness = fitness(chromosome, max_generations)
-        fitness_scores.append(curr_fitness)
+    population.set_scores(run.evaluate(population.grids()))
+    run.lap("evaluation")
 
-    average_fitness = int(sum(score[1] for score in fitness_scores) / len(fitness_scores))
+    average_fitness = int(population.max_diff[:len(population)].sum() / len(population))
     avg_fitness_graph_data.append(average_fitness)
-    print(f"Initial Average Fitness: {average_fitness}")
     # Find the best solution (the chromosome with the highest fitness score, based on cell difference between start and end)
-    best_solution = max(zip(population, fitness_scores), key=lambda x: x[1][0])
-    best_chromosome = best_solution[0]
-    best_fitness = best_solution[1]
+    best_index = int(np.argmax(population.generations[:len(population)]))
+    best_chromosome = population.copy(best_index)
+    best_fitness = population.score(best_index)
 
     best_fitness_graph_data.append(best_fitness[1])
-    print(f"Initial Best Fitness: {best_fitness[1]}")   
-    
+    if run.on_generation is not None:
+        run.on_generation(0, best_chromosome, best_fitness)
+        run.lap("on_generation")
+    if run.checkpoint is not None:
+        run.save_checkpoint(0, False, population, best_chromosome, best_fitness, avg_fitness_graph_data,
+                            best_fitness_graph_data)
+        run.lap("checkpoint")
+    if run.progress is not None:
+        run.report(0, len(population), best_fitness[1], average_fitness)
+    return _generations(run, 0, population, best_chromosome, best_fitness, avg_fitness_graph_data,
+                        best_fitness_graph_data)
+
+# Continue a run from its checkpoint
+def _resume(run):
+    state = run.checkpoint.load()
+    run.checkpoint.check_parameters(state, run.parameters)
+    if run.packed:
+        population = ListPopulation([Grid.from_array(grid) for grid in state.population], run.capacity)
+        best_chromosome = Grid.from_array(state.best_chromosome)
+    else:
+        population = ArrayPopulation(state.population, run.capacity)
+        best_chromosome = state.best_chromosome.copy()
+    if state.finished:
+        return _results(best_chromosome, state.best_fitness, state.avg_fitness_graph_data, state.best_fitness_graph_data)
+    population.set_scores(state.fitness_scores)
+    random.setstate(state.random_state)
+    run.checkpoint.restore_evaluation_state(state.evaluation_state)
+    run.start_cache_stats()
+    return _generations(run, state.generation, population, best_chromosome, state.best_fitness,
+                        state.avg_fitness_graph_data, state.best_fitness_graph_data)
+
+def _results(best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data):
+    if isinstance(best_chromosome, np.ndarray):
+        best_chromosome = best_chromosome.tolist()
+    return best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data
+
+# The generations of the genetic algorithm, from generation 'start' on
+def _generations(run, start, population, best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data):
+    finished = True
     # Iterate through generations
-    for generation in range(stabilization_generations):
-        # Remove elements from population and fitness_scores if they have reached the max_generations or have a fitness score of 0
-        try:
-            population, fitness_scores = zip(*[(chromosome, score) for chromosome, score in zip(population, fitness_scores) if score[0] < max_generations and score[1] != 0])
-        except ValueError:
+    for generation in range(start, run.stabilization_generations):
+        if run.cancel is not None and run.cancel():
+            finished = False
+            break
+        # Keep the chromosomes which haven't reached the max_generations and have a fitness score other than 0
+        survivors = population.survivors(run.max_generations)
+        if not survivors:
             break
-        population, fitness_scores = list(population), list(fitness_scores)
         # we decide to use roulette wheel selection with 70% probability, for better results
+        # the selection works on the indices of the survivors
         if random.random() < 0.7:
-            selected = roulette_wheel_selection(population, fitness_scores)
+            selected = roulette_wheel_selection(survivors, population.scores(survivors))
         else:
-            selected = tournament_selection(population, fitness_scores)
-        offspring_population = []
-        
-        # Crossover and mutation
+            selected = tournament_selection(survivors, population.scores(survivors))
+        run.lap("selection")
+
+        # Crossover and mutation, the children are written directly into the next generation
         # we decide to duplicate 70% probability, for better results
-        for _ in range(len(population)):
-            fitness_scores = []
+        population.start_generation(len(survivors) + 1)
+        for index in range(len(survivors)):
             # taking 2 parents from the selected population, after the selection process
             parent1 = random.choice(selected)
+            child = population.child(index, parent1)
             if random.random() < 0.7:
-                offspring = copy.deepcopy(parent1)
-                offspring = mutate(offspring, MUTATION_RATE)
+                mutate(child, run.MUTATION_RATE)
             else:
-                offspring1 = copy.deepcopy(parent1)
                 parent2 = random.choice(selected)
-                offspring2 = copy.deepcopy(parent2)
-                offspring = crossover(offspring1, offspring2)
-            offspring_population.append(offspring)
-        
-        #always keep the best chromosome from the previous generation
-        offspring_population.append(best_chromosome)
+                crossover(child, population.get(parent2), in_place=True)
 
-        population = offspring_population
-        for chromosome in population:
-            curr_fitness = fitness(chromosome, max_generations)
-            fitness_scores.append(curr_fitness)
+        #always keep the best chromosome from the previous generation
+        population.set_child(len(survivors), best_chromosome)
 
+        population.swap()
+        run.lap("variation")
+        population.set_scores(run.evaluate(population.grids()))
+        run.lap("evaluation")
 
-        fitness_values = [score[1] for score in fitness_scores]
 
         # Calculate the average fitness of the current generation
-        average_fitness = int(sum(score[1] for score in fitness_scores) / len(fitness_scores))
+        average_fitness = int(population.max_diff[:len(population)].sum() / len(population))
         avg_fitness_graph_data.append(average_fitness)
 
 
-        # Track the best solution
-        best_fitness_value = 0
-        for i in range(len(population)):
-            if fitness_scores[i][1] > best_fitness_value:
-                best_chromosome = population[i]
-                best_fitness_value = fitness_scores[i][1]
-                best_fitness = fitness_scores[i]
+        # Track the best solution, the first chromosome with the highest fitness score
+        best_index = int(np.argmax(population.max_diff[:len(population)]))
+        best_fitness_value = int(population.max_diff[best_index])
+        if best_fitness_value > 0:
+            best_chromosome = population.copy(best_index)
+            best_fitness = population.score(best_index)
 
         best_fitness_graph_data.append(best_fitness_value)
-
-        print(f"Generation {generation} Fitness Scores: {fitness_values} ")
-        print(f"Generation {generation} best_chromosome's fitness: {best_fitness[1]}")
-        print(f"Generation {generation} Average Fitness: {average_fitness}\n")
-        print("Average Fitness over generations: ",avg_fitness_graph_data)
-        print(f"Best Fitness over generations: {best_fitness_graph_data}\n\n")
+        if run.on_generation is not None:
+            run.on_generation(generation + 1, best_chromosome, best_fitness)
+            run.lap("on_generation")
 
         # Return the best grid and its fitness score if the population size is less than 3 (tournament size)
-        if len(population) < 3:
+        last = len(population) < 3
+        if not last and run.migration is not None:
+            run.migration(generation + 1, population)
+            run.lap("migration")
+        if not last and run.checkpoint is not None and run.checkpoint.due(generation + 1):
+            run.save_checkpoint(generation + 1, False, population, best_chromosome, best_fitness,
+                                avg_fitness_graph_data, best_fitness_graph_data)
+            run.lap("checkpoint")
+        # reported once the hooks ran, so their time isn't counted in the selection of the next generation
+        if run.progress is not None:
+            run.report(generation + 1, len(population), best_fitness_value, average_fitness)
+        if last:
             break
 
-    
-    return best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data
+    if run.checkpoint is not None:
+        # a cancelled run is saved at the generation it stopped at, so it can be resumed
+        run.save_checkpoint(run.stabilization_generations if finished else generation, finished, population,
+                            best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data)
+    return _results(best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data)
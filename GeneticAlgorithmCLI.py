@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from GeneticAlgorithm import genetic_algorithm, simulate, check_budget_options, EXECUTORS, POP_SIZE, MAX_GENERATIONS, GENERATIONS_UNTIL_STOP, MUTATION_RATE, GRID_SIZE
+from CycleDetection import CYCLE_DETECTIONS
+from FitnessCache import FitnessCache
+from FitnessBudget import FitnessBudget
+from Islands import island_model, TOPOLOGIES, TRANSPORTS
+from Grid import to_list
+from LifeEngine import DEFAULT_ENGINE, ENGINES
+from Metrics import JsonlMetricsSink, combine_sinks, print_progress
+from Novelty import NoveltyArchive
+from PatternIO import save_pattern
+from PatternLibrary import PatternLibrary
+
+# Headless entry point of the genetic algorithm, for servers without a display
+# PyQt5 is never imported, and matplotlib only when a plot is requested
+#
+#   python GeneticAlgorithmCLI.py --population-size 200 --max-generations 1000 --seed 1 --output-dir runs/1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evolve Game of Life patterns with the genetic algorithm, without the GUI.")
+    parser.add_argument("--population-size", type=int, default=POP_SIZE, help="number of chromosomes per generation")
+    parser.add_argument("--max-generations", type=int, default=MAX_GENERATIONS, help="max Game of Life generations simulated per grid")
+    parser.add_argument("--stabilization-generations", type=int, default=GENERATIONS_UNTIL_STOP, help="number of genetic algorithm generations")
+    parser.add_argument("--mutation-rate", type=float, default=MUTATION_RATE)
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE)
+    parser.add_argument("--seed", type=int, default=None, help="seed of the run, for reproducible results")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument("--cycle-detection", choices=CYCLE_DETECTIONS, default="hash")
+    parser.add_argument("--executor", choices=sorted(EXECUTORS), default="serial")
+    parser.add_argument("--workers", type=int, default=None, help="number of workers of the executor (default: number of CPUs)")
+    parser.add_argument("--packed", action="store_true", help="evolve bit-packed chromosomes")
+    parser.add_argument("--cache", metavar="PATH", default=None, help="fitness cache file, loaded and saved back")
+    parser.add_argument("--cache-size", type=int, default=100000)
+    parser.add_argument("--novelty-threshold", type=float, default=None,
+                        help="skip the chromosomes whose live cells are at least this similar (Jaccard, 0-1) to an evaluated one")
+    parser.add_argument("--budgeted", action="store_true",
+                        help="stop simulating the grids which can't compete early, by successive halving (not with islands)")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="max Game of Life generations simulated per genetic algorithm generation (implies --budgeted)")
+    parser.add_argument("--checkpoint", metavar="PATH", default=None, help="checkpoint file, the run resumes from it if it exists")
+    parser.add_argument("--checkpoint-interval", type=int, default=1, help="generations between two checkpoints")
+    parser.add_argument("--islands", type=int, default=1,
+                        help="number of island populations, each in its own process (the executor is not used)")
+    parser.add_argument("--migration-interval", type=int, default=5, help="generations between two migrations of the islands")
+    parser.add_argument("--migration-size", type=int, default=1, help="number of chromosomes sent by an island at every migration")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="ring")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="queue")
+    parser.add_argument("--output-dir", default=".", help="directory of the result files")
+    parser.add_argument("--library", metavar="DIR", default=None, help="also append the best chromosome to this pattern library")
+    parser.add_argument("--plot", action="store_true", help="also save the fitness graph as fitness.png")
+    parser.add_argument("--metrics", action="store_true", help="write the metrics of every generation to metrics.jsonl")
+    parser.add_argument("--verbose", action="store_true", help="print the metrics of every generation")
+    args = parser.parse_args(argv)
+    if args.islands > 1:
+        # the islands only run the plain genetic algorithm
+        for option, value in (("--cache", args.cache), ("--checkpoint", args.checkpoint),
+                              ("--novelty-threshold", args.novelty_threshold),
+                              ("--budgeted/--budget", args.budgeted or args.budget is not None)):
+            if value:
+                parser.error(f"{option} can't be used with --islands")
+    if args.budgeted or args.budget is not None:
+        try:
+            check_budget_options(args.engine, args.executor, args.cycle_detection)
+        except ValueError as error:
+            parser.error(f"--budgeted/--budget: {error}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache = FitnessCache(args.cache_size, args.cache) if args.cache else None
+    budget = FitnessBudget(args.budget) if args.budgeted or args.budget is not None else None
+    novelty = NoveltyArchive(args.novelty_threshold) if args.novelty_threshold is not None else None
+    metrics_sink = JsonlMetricsSink(os.path.join(args.output_dir, "metrics.jsonl")) if args.metrics else None
+
+    start = time.perf_counter()
+    progress = combine_sinks(metrics_sink, print_progress if args.verbose else None)
+    try:
+        if args.islands > 1:
+            best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data = island_model(
+                args.islands, args.population_size, args.grid_size, args.max_generations, args.stabilization_generations,
+                args.mutation_rate, migration_interval=args.migration_interval, migration_size=args.migration_size,
+                topology=args.topology, transport=args.transport, engine=args.engine, seed=args.seed,
+                cycle_detection=args.cycle_detection, packed=args.packed, progress=progress)
+        else:
+            best_chromosome, best_fitness, avg_fitness_graph_data, best_fitness_graph_data = genetic_algorithm(
+                args.population_size, args.grid_size, args.max_generations, args.stabilization_generations, args.mutation_rate,
+                engine=args.engine, executor=args.executor, workers=args.workers, seed=args.seed,
+                cycle_detection=args.cycle_detection, cache=cache, novelty=novelty, budget=budget, packed=args.packed,
+                checkpoint=args.checkpoint, checkpoint_interval=args.checkpoint_interval, progress=progress)
+    finally:
+        if metrics_sink is not None:
+            metrics_sink.close()
+    elapsed = time.perf_counter() - start
+
+    # the best chromosome uses the same formats as the GUI "Save Chromosome"
+    best_chromosome = to_list(best_chromosome)
+    save_pattern(os.path.join(args.output_dir, "best_chromosome.json"), best_chromosome)
+    save_pattern(os.path.join(args.output_dir, "best_chromosome.rle"), best_chromosome)
+    if args.library:
+        simulation = simulate(best_chromosome, args.max_generations, args.engine)
+        PatternLibrary(args.library).append(best_chromosome, best_fitness, simulation.period)
+    results = {
+        "parameters": {name: value for name, value in vars(args).items() if name not in ("output_dir", "plot", "metrics", "verbose", "checkpoint", "checkpoint_interval", "library")},
+        "best_fitness": best_fitness,
+        "avg_fitness_graph_data": avg_fitness_graph_data,
+        "best_fitness_graph_data": best_fitness_graph_data,
+        "elapsed_seconds": elapsed,
+    }
+    if cache is not None:
+        results["cache"] = cache.stats()
+    if budget is not None:
+        results["budget"] = budget.stats()
+    if novelty is not None:
+        results["novelty"] = novelty.stats()
+    with open(os.path.join(args.output_dir, "results.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.plot:
+        save_fitness_graph(os.path.join(args.output_dir, "fitness.png"), avg_fitness_graph_data, best_fitness_graph_data)
+
+    print(f"Best fitness: {best_fitness[1]} (stabilizes at generation {best_fitness[0]}), {elapsed:.1f}s")
+    return 0
+
+
+# Same graph as the GUI "Plot Fitness Graph", written to a file with a non interactive backend
+def save_fitness_graph(path, avg_fitness_graph_data, best_fitness_graph_data):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    generations = list(range(len(best_fitness_graph_data)))
+    plt.plot(generations, best_fitness_graph_data, marker='o', color='b', label='Best Fitness')
+    plt.plot(generations, avg_fitness_graph_data, marker='x', color='r', label='Average Fitness')
+    plt.title("Fitness over Generations")
+    plt.xlabel("Generation")
+    plt.ylabel("Fitness")
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(path)
+    plt.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
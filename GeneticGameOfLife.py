@@ -1,17 +1,28 @@
-from GeneticAlgorithm import genetic_algorithm, create_initial_population
-from PyQt5.QtWidgets import QDialog, QLineEdit, QLabel, QFileDialog, QPushButton, QApplication, QMainWindow, QVBoxLayout, QWidget, QGridLayout
-from PyQt5.QtCore import QTimer
-from PyQt5.QtGui import QColor, QPainter, QBrush
+from GeneticAlgorithm import genetic_algorithm, create_initial_population, POP_SIZE, MAX_GENERATIONS, GENERATIONS_UNTIL_STOP, MUTATION_RATE, GRID_SIZE
+from Grid import to_list
+from PatternIO import save_pattern, load_pattern, square_grid, PATTERN_FORMATS
+from StepAhead import StepAheadBuffer
+from Metrics import print_progress, combine_sinks
+from PyQt5.QtWidgets import QDialog, QLineEdit, QLabel, QFileDialog, QPushButton, QApplication, QMainWindow, QVBoxLayout, QWidget, QGridLayout, QSpinBox
+from PyQt5.QtCore import QTimer, QThread, QRect, QLine, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QImage
+import numpy as np
+import os
 import sys
-import json
-import matplotlib.pyplot as plt
+import threading
 
 # Define constants
-POP_SIZE = 10 
-MAX_GENERATIONS = 400  
-GENERATIONS_UNTIL_STOP = 20  
-MUTATION_RATE = 0.5
-GRID_SIZE = 30
+ENGINE = "sparse"  # step engine of the simulation, only the region around the live cells is computed
+STEPS_PER_SECOND = 10  # default frame rate of the simulation
+STEP_AHEAD_FRAMES = 32  # frames computed in advance by the step-ahead buffer
+CHROMOSOME_EXTENSIONS = {"JSON Files (*.json)": ".json", "RLE Files (*.rle)": ".rle", "Packed Files (*.gol)": ".gol"}
+CHROMOSOME_FILTERS = ";;".join(CHROMOSOME_EXTENSIONS)
+
+
+# Chromosome file format of a file dialog filter, JSON (the original format) by default
+def filter_format(selected_filter):
+    return PATTERN_FORMATS[CHROMOSOME_EXTENSIONS.get(selected_filter, ".json")]
+
 
 class GeneticGameOfLife(QMainWindow):
     def __init__(self, grid_size=GRID_SIZE, cell_size=15):
@@ -25,6 +36,10 @@ class GeneticGameOfLife(QMainWindow):
         self.fitness_data = []  # List to store fitness over generations
         self.avg_fitness_data = []  # List to store average fitness over generations
         self.population = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
+        self.player = None  # StepAheadBuffer of the displayed grid, rebuilt whenever the population is replaced
+        self.player_grid = None
+        self.peak_generation = 0
+        self.evolution = None  # EvolutionWorker of the running genetic algorithm
 
         self.init_ui()
 
@@ -77,6 +92,11 @@ class GeneticGameOfLife(QMainWindow):
         self.optimize_button.clicked.connect(self.optimize_with_genetic_algorithm)
         self.controls_layout.addWidget(self.optimize_button, 1, 2)
 
+        self.cancel_button = QPushButton("Cancel Evolution")
+        self.cancel_button.clicked.connect(self.cancel_evolution)
+        self.cancel_button.setEnabled(False)
+        self.controls_layout.addWidget(self.cancel_button, 1, 3)
+
         self.generation_label = QLabel(f"Generation: {self.generation}")
         self.generation_label.setStyleSheet("font-size: 17px;")
         self.controls_layout.addWidget(self.generation_label, 2, 0, 1, 1)
@@ -91,14 +111,54 @@ Mutation Rate = {MUTATION_RATE}
 Grid Size = {GRID_SIZE}""")
         self.controls_layout.addWidget(self.params,2, 3, 1, 4)
 
+        # frames per second of the simulation, and generations computed for every frame
+        self.controls_layout.addWidget(QLabel("Steps per second:"), 4, 0)
+        self.rate_input = QSpinBox()
+        self.rate_input.setRange(1, 1000)
+        self.rate_input.setValue(STEPS_PER_SECOND)
+        self.rate_input.valueChanged.connect(self.set_step_rate)
+        self.controls_layout.addWidget(self.rate_input, 4, 1)
+
+        self.controls_layout.addWidget(QLabel("Generations per frame:"), 4, 2)
+        self.skip_input = QSpinBox()
+        self.skip_input.setRange(1, 100000)
+        self.skip_input.setValue(1)
+        self.skip_input.valueChanged.connect(self.set_generations_per_frame)
+        self.controls_layout.addWidget(self.skip_input, 4, 3)
+
+        self.jump_input = QSpinBox()
+        self.jump_input.setRange(0, 10000000)
+        self.controls_layout.addWidget(self.jump_input, 5, 0)
+
+        self.jump_button = QPushButton("Jump to Generation")
+        self.jump_button.clicked.connect(lambda: self.jump_to_generation(self.jump_input.value()))
+        self.controls_layout.addWidget(self.jump_button, 5, 1)
+
+        # generations reported by the genetic algorithm for the evolved chromosome
+        self.peak_button = QPushButton("Jump to Peak")
+        self.peak_button.clicked.connect(lambda: self.jump_to_generation(self.peak_generation))
+        self.peak_button.setEnabled(False)
+        self.controls_layout.addWidget(self.peak_button, 5, 2)
+
+        self.stabilization_button = QPushButton("Jump to Stabilization")
+        self.stabilization_button.clicked.connect(lambda: self.jump_to_generation(self.future_generation))
+        self.stabilization_button.setEnabled(False)
+        self.controls_layout.addWidget(self.stabilization_button, 5, 3)
+
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.step)
+        # shows the frame of a jump once it is computed, while the simulation is stopped
+        self.jump_timer = QTimer()
+        self.jump_timer.timeout.connect(self.show_jump)
 
     def start(self):
         if not self.running:
             self.running = True
-            self.timer.start(100)
+            self.timer.start(1000 // self.rate_input.value())
+
+    def set_step_rate(self, steps_per_second):
+        self.timer.setInterval(1000 // steps_per_second)
 
     def stop(self):
         self.running = False
@@ -109,6 +169,7 @@ Grid Size = {GRID_SIZE}""")
         self.timer.stop()
         self.generation = 0
         self.population = [[0 for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        self.reset_jumps()
         self.generation_label.setText(f"Generation: {self.generation}")
         self.canvas.set_grid(self.population)
 
@@ -117,59 +178,128 @@ Grid Size = {GRID_SIZE}""")
         self.timer.stop()
         self.generation = 0
         self.population = create_initial_population(1, self.grid_size)[0]
+        self.reset_jumps()
         self.generation_label.setText(f"Generation: {self.generation}")
         self.canvas.set_grid(self.population)
 
+    # the file format (JSON, RLE or packed binary) is chosen by the extension, see PatternIO.py,
+    # files with another extension use the format of the selected filter
     def save_chromosome(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getSaveFileName(self, "Save Chromosome", "", "JSON Files (*.json)", options=options)
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Save Chromosome", "", CHROMOSOME_FILTERS, options=options)
         if file_name:
-            with open(file_name, "w") as f:
-                json.dump(self.population, f)
+            if not os.path.splitext(file_name)[1]:
+                file_name += CHROMOSOME_EXTENSIONS.get(selected_filter, ".json")
+            try:
+                save_pattern(file_name, self.population, filter_format(selected_filter))
+            except (ValueError, OSError) as error:
+                self.starting_cells_label.setText(f"Saving failed: {error}")
 
     def load_chromosome(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getOpenFileName(self, "Load Chromosome", "", "JSON Files (*.json)", options=options)
+        file_name, selected_filter = QFileDialog.getOpenFileName(self, "Load Chromosome", "", CHROMOSOME_FILTERS, options=options)
         if file_name:
-            with open(file_name, "r") as f:
-                self.population = json.load(f)
+            try:
+                population = square_grid(load_pattern(file_name, filter_format(selected_filter)))
+            except (ValueError, OSError) as error:
+                self.starting_cells_label.setText(f"Loading failed: {error}")
+                return
+            self.population = population
+            self.reset_jumps()
             self.grid_size = len(self.population)
+            self.generation = 0
+            self.generation_label.setText(f"Generation: {self.generation}")
             self.canvas.set_grid(self.population)
 
     def open_settings(self):
         settings_dialog = SettingsDialog(self)
         settings_dialog.exec_()
 
+    # Show the next frame of the simulation, computed ahead by the step-ahead buffer
+    # returns False when the frame isn't ready yet, the display then just waits for the next timer tick
     def step(self):
-        new_population = [[0 for _ in range(self.grid_size)] for _ in range(self.grid_size)]
-        for y in range(self.grid_size):
-            for x in range(self.grid_size):
-                live_neighbors = self.count_live_neighbors(x, y)
-                if self.population[y][x] == 1:
-                    if live_neighbors in [2, 3]:
-                        new_population[y][x] = 1
-                else:
-                    if live_neighbors == 3:
-                        new_population[y][x] = 1
-        self.population = new_population
-        self.generation += 1
+        frame = self.get_player().poll()
+        if frame is None:
+            return False
+        self.generation, self.population = frame
+        self.player_grid = self.population
         self.generation_label.setText(f"Generation: {self.generation}")
         self.canvas.set_grid(self.population)
+        return True
+
+    # Step-ahead buffer of the displayed grid, restarted from the population whenever it was replaced
+    def get_player(self):
+        if self.player is None or self.player_grid is not self.population:
+            if self.player is not None:
+                self.player.close()
+            self.player = StepAheadBuffer(self.population, ENGINE, STEP_AHEAD_FRAMES, self.skip_input.value(), self.generation)
+            self.player_grid = self.population
+        return self.player
+
+    def set_generations_per_frame(self, generations):
+        if self.player is not None:
+            self.player.set_stride(generations)
+
+    # The peak and stabilization generations belong to the evolved chromosome, not to a grid which replaced it
+    def reset_jumps(self):
+        self.peak_button.setEnabled(False)
+        self.stabilization_button.setEnabled(False)
+
+    def jump_to_generation(self, generation):
+        self.get_player().jump(generation)
+        if not self.running:
+            self.jump_timer.start(20)
 
-    def count_live_neighbors(self, x, y):
-        directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        count = 0
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.grid_size and 0 <= ny < self.grid_size:
-                count += self.population[ny][nx]
-        return count
+    def show_jump(self):
+        if self.running or self.step():
+            self.jump_timer.stop()
 
+    # The genetic algorithm runs in a worker thread, the window stays responsive and shows the best chromosome
+    # of every generation while it evolves
     def optimize_with_genetic_algorithm(self, _, pop_size=POP_SIZE, max_generations=MAX_GENERATIONS, generations_until_stop=GENERATIONS_UNTIL_STOP):
-        best_chromosome, best_score, average_fitness_graph_data, best_fitness_graph_data = genetic_algorithm(pop_size, self.grid_size, max_generations, generations_until_stop, MUTATION_RATE)
+        if self.evolution is not None:
+            return
+        self.stop()
+        self.fitness_data = []
+        self.avg_fitness_data = []
+        self.evolution = EvolutionWorker(pop_size, self.grid_size, max_generations, generations_until_stop, MUTATION_RATE)
+        self.evolution.progress.connect(self.show_evolution_progress)
+        self.evolution.best_chromosome.connect(self.show_best_chromosome)
+        self.evolution.result.connect(self.show_evolution_result)
+        self.evolution.failed.connect(self.show_evolution_error)
+        self.evolution.finished.connect(self.evolution_finished)
+        self.optimize_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.starting_cells_label.setText("Evolving...")
+        self.evolution.start()
+
+    def cancel_evolution(self):
+        if self.evolution is not None:
+            self.evolution.cancel()
+            self.cancel_button.setEnabled(False)
+            self.starting_cells_label.setText("Cancelling after the current generation...")
+
+    def show_evolution_progress(self, record):
+        self.fitness_data.append(record["best_fitness"])
+        self.avg_fitness_data.append(record["average_fitness"])
+
+    def show_best_chromosome(self, generation, best_chromosome, best_score):
         self.population = best_chromosome
+        self.reset_jumps()
+        self.generation = 0
+        self.generation_label.setText(f"Evolution generation: {generation}")
+        self.starting_cells_label.setText(f"Evolving... best max diff {best_score[1]} cells,\nstabilizing at gen: {best_score[0]}")
+        self.canvas.set_grid(self.population)
+
+    def show_evolution_result(self, best_chromosome, best_score, average_fitness_graph_data, best_fitness_graph_data):
+        self.population = best_chromosome
+        self.generation = 0
+        self.generation_label.setText(f"Generation: {self.generation}")
         self.future_generation = best_score[0]
         display_stats = best_score[2]
+        self.peak_generation = display_stats[2]
+        self.peak_button.setEnabled(True)
+        self.stabilization_button.setEnabled(True)
         self.avg_fitness_data = average_fitness_graph_data
         self.fitness_data = best_fitness_graph_data
         curr_population = sum(cell == 1 for row in best_chromosome for cell in row)
@@ -181,7 +311,26 @@ Grid Size = {GRID_SIZE}""")
         self.canvas.set_grid(self.population)
         self.canvas.update()
 
+    def show_evolution_error(self, message):
+        self.starting_cells_label.setText(f"Evolution failed: {message}")
+
+    def evolution_finished(self):
+        self.evolution = None
+        self.optimize_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    # Stop a running evolution before closing the window
+    def closeEvent(self, event):
+        if self.evolution is not None:
+            self.evolution.cancel()
+            self.evolution.wait()
+        if self.player is not None:
+            self.player.close()
+        super().closeEvent(event)
+
     def plot_fitness_graph(self):
+        import matplotlib.pyplot as plt  # imported on first use, matplotlib is slow to load
+
         generations = list(range(len(self.fitness_data)))  # Generation numbers from 0 to len(fitness_values)-1
         # Plotting the graph
         plt.plot(generations, self.fitness_data, marker='o', color='b', label='Best Fitness')
@@ -195,25 +344,86 @@ Grid Size = {GRID_SIZE}""")
 
 
 
+# Worker thread running the genetic algorithm, the results come back to the window through signals
+# (queued to the GUI thread), cancel() stops the run after the current generation
+class EvolutionWorker(QThread):
+    progress = pyqtSignal(object)  # metrics record of every generation (see Metrics.py)
+    best_chromosome = pyqtSignal(int, object, object)  # generation, best chromosome (list of lists), its fitness
+    result = pyqtSignal(object, object, object, object)  # what genetic_algorithm returns
+    failed = pyqtSignal(str)
+
+    def __init__(self, population_size, grid_size, max_generations, stabilization_generations, mutation_rate):
+        super().__init__()
+        self.parameters = (population_size, grid_size, max_generations, stabilization_generations, mutation_rate)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            result = genetic_algorithm(*self.parameters, progress=combine_sinks(print_progress, self.progress.emit),
+                                       on_generation=self.emit_best_chromosome, cancel=self.cancelled.is_set)
+        except Exception as error:
+            self.failed.emit(str(error))
+            return
+        self.result.emit(*result)
+
+    def emit_best_chromosome(self, generation, best_chromosome, best_fitness):
+        self.best_chromosome.emit(generation, to_list(best_chromosome), best_fitness)
+
+
+# The grid is kept as an image with one pixel per cell, drawn scaled by cell_size in one call,
+# and set_grid only repaints the bounding box of the cells which changed
 class Canvas(QWidget):
     def __init__(self, grid, cell_size):
         super().__init__()
-        self.grid = grid
         self.cell_size = cell_size
+        self.cells = None
+        self.set_grid(grid)
 
     def set_grid(self, grid):
+        previous = self.cells
         self.grid = grid
+        self.cells = np.asarray(grid, dtype=np.uint8)
+        # live cells are black, dead cells white, the image reads the pixels from this buffer
+        self.pixels = np.ascontiguousarray(np.where(self.cells == 1, np.uint8(0), np.uint8(255)))
+        height, width = self.pixels.shape
+        self.image = QImage(self.pixels.data, width, height, width, QImage.Format_Grayscale8)
+        if previous is None or previous.shape != self.cells.shape:
+            self.update()
+            return
+        rows, cols = np.nonzero(previous != self.cells)
+        if rows.size:
+            top, left = int(rows.min()), int(cols.min())
+            self.update(self.cell_rect(top, left, int(rows.max()) + 1, int(cols.max()) + 1))
+
+    def set_cell_size(self, cell_size):
+        self.cell_size = cell_size
         self.update()
 
+    # Widget rectangle of the cells [top, bottom) x [left, right), with the border of the last cells
+    def cell_rect(self, top, left, bottom, right):
+        size = self.cell_size
+        return QRect(left * size, top * size, (right - left) * size + 1, (bottom - top) * size + 1)
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        for y, row in enumerate(self.grid):
-            for x, cell in enumerate(row):
-                if cell == 1:
-                    painter.setBrush(QBrush(QColor(0, 0, 0)))
-                else:
-                    painter.setBrush(QBrush(QColor(255, 255, 255)))
-                painter.drawRect(x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size)
+        size = self.cell_size
+        height, width = self.cells.shape
+        # only the cells inside the repainted rectangle are drawn
+        rect = event.rect()
+        top, left = max(0, rect.top() // size), max(0, rect.left() // size)
+        bottom, right = min(height, rect.bottom() // size + 1), min(width, rect.right() // size + 1)
+        if top >= bottom or left >= right:
+            return
+        painter.drawImage(QRect(left * size, top * size, (right - left) * size, (bottom - top) * size),
+                          self.image, QRect(left, top, right - left, bottom - top))
+        # cell borders, when the cells are large enough for them
+        if size >= 4:
+            painter.setPen(QColor(0, 0, 0))
+            painter.drawLines([QLine(x * size, top * size, x * size, bottom * size) for x in range(left, right + 1)] +
+                              [QLine(left * size, y * size, right * size, y * size) for y in range(top, bottom + 1)])
 
 
 class SettingsDialog(QDialog):
@@ -235,7 +445,8 @@ class SettingsDialog(QDialog):
         grid_size = int(self.grid_size_input.text())
         self.parent().grid_size = grid_size
         self.parent().population = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
-        self.parent().cell_size = 800 // grid_size
+        self.parent().cell_size = max(1, 800 // grid_size)
+        self.parent().canvas.set_cell_size(self.parent().cell_size)
         self.parent().canvas.set_grid(self.parent().population)
 
         self.accept()
@@ -0,0 +1,145 @@
+import numpy as np
+
+
+# Compact grid of 0s and 1s: every row is stored as one Python int, bit x being the cell of column x
+# A Grid behaves like the list of lists used everywhere else (len, grid[y][x], grid[y][x] = 1, iteration,
+# 1 in grid[y], grid[y] = other_grid[y]), so mutate, crossover and the GUI work with both representations,
+# while copying it only copies one int per row
+class Grid:
+    def __init__(self, rows, width):
+        self.rows = list(rows)
+        self.width = width
+
+    @classmethod
+    def zeros(cls, height, width=None):
+        return cls([0] * height, height if width is None else width)
+
+    @classmethod
+    def from_list(cls, grid):
+        if isinstance(grid, Grid):
+            return grid.copy()
+        width = len(grid[0]) if len(grid) else 0
+        return cls.from_array(np.array(grid, dtype=np.uint8).reshape(len(grid), width))
+
+    @classmethod
+    def from_array(cls, cells):
+        height, width = cells.shape
+        packed = np.packbits(cells.astype(np.uint8), axis=1, bitorder="little")
+        return cls([int.from_bytes(row.tobytes(), "little") for row in packed], width)
+
+    def to_array(self):
+        row_bytes = (self.width + 7) // 8
+        packed = np.frombuffer(b"".join(row.to_bytes(row_bytes, "little") for row in self.rows), dtype=np.uint8)
+        cells = np.unpackbits(packed.reshape(len(self.rows), row_bytes), axis=1, bitorder="little")
+        return cells[:, :self.width]
+
+    def __array__(self, dtype=None, copy=None):
+        cells = self.to_array()
+        return cells if dtype is None else cells.astype(dtype)
+
+    def tolist(self):
+        return self.to_array().tolist()
+
+    def copy(self):
+        return Grid(self.rows, self.width)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for y in range(len(self.rows)):
+            yield GridRow(self, y)
+
+    def __getitem__(self, y):
+        return GridRow(self, y)
+
+    def __setitem__(self, y, row):
+        if isinstance(row, GridRow):
+            self.rows[y] = row.grid.rows[row.y]
+        else:
+            self.rows[y] = sum(1 << x for x, cell in enumerate(row) if cell)
+
+    def __eq__(self, other):
+        if isinstance(other, Grid):
+            return self.width == other.width and self.rows == other.rows
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Grid({len(self.rows)}x{self.width}, {self.population()} alive)"
+
+    def population(self):
+        return sum(bin(row).count("1") for row in self.rows)
+
+    # Positions (y, x) of the live cells, row by row
+    def live_cells(self):
+        cells = []
+        for y, row in enumerate(self.rows):
+            x = 0
+            while row:
+                if row & 1:
+                    cells.append((y, x))
+                row >>= 1
+                x += 1
+        return cells
+
+
+# View of one row of a Grid
+class GridRow:
+    def __init__(self, grid, y):
+        self.grid = grid
+        self.y = y
+
+    def __len__(self):
+        return self.grid.width
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self[i] for i in range(*x.indices(self.grid.width))]
+        if x < 0:
+            x += self.grid.width
+        if not 0 <= x < self.grid.width:
+            raise IndexError("grid row index out of range")
+        return (self.grid.rows[self.y] >> x) & 1
+
+    def __setitem__(self, x, cell):
+        if x < 0:
+            x += self.grid.width
+        if not 0 <= x < self.grid.width:
+            raise IndexError("grid row index out of range")
+        if cell:
+            self.grid.rows[self.y] |= 1 << x
+        else:
+            self.grid.rows[self.y] &= ~(1 << x)
+
+    def __iter__(self):
+        row = self.grid.rows[self.y]
+        for x in range(self.grid.width):
+            yield (row >> x) & 1
+
+    def __contains__(self, cell):
+        row = self.grid.rows[self.y]
+        if cell == 1:
+            return row != 0
+        if cell == 0:
+            return row != (1 << self.grid.width) - 1
+        return False
+
+
+# Return a grid as a list of lists (the JSON chromosome format), whether it is a Grid, an array or already a list
+def to_list(grid):
+    if isinstance(grid, (Grid, np.ndarray)):
+        return grid.tolist()
+    return grid
+
+
+# Copy a grid, either a Grid, a NumPy array or a list of lists
+def copy_grid(grid):
+    if isinstance(grid, (Grid, np.ndarray)):
+        return grid.copy()
+    return [row[:] for row in grid]
@@ -0,0 +1,216 @@
+import hashlib
+
+import numpy as np
+
+# HashLife: the grid is stored as a quadtree of hash-consed nodes, and the future of every node is memoized,
+# so a grid can jump forward by 2^j generations at once and repeated structures are only computed once.
+#
+# Bounded universe: cells have 3 states, dead, alive and wall. The grid is embedded in a universe made of
+# wall cells, walls count as dead neighbours and never come alive. This gives exactly the dead border of the
+# other engines at every generation (and not only at the end of a jump), while keeping the rule the same
+# everywhere, which is what makes the memoization valid.
+
+DEAD, ALIVE, WALL = 0, 1, 2
+DIGEST_SIZE = 16
+
+
+# Node of the quadtree, a leaf (level 0) is one cell, a node of level k covers 2^k x 2^k cells
+class Node:
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population", "digest", "cell")
+
+    def __init__(self, level, nw=None, ne=None, sw=None, se=None, cell=None):
+        self.level = level
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.cell = cell
+        if level == 0:
+            self.population = 1 if cell == ALIVE else 0
+            self.digest = bytes([cell]) * DIGEST_SIZE
+        else:
+            self.population = nw.population + ne.population + sw.population + se.population
+            # structural digest, equal nodes have equal digests even if they were built separately
+            self.digest = hashlib.blake2b(nw.digest + ne.digest + sw.digest + se.digest, digest_size=DIGEST_SIZE).digest()
+
+
+LEAVES = {cell: Node(0, cell=cell) for cell in (DEAD, ALIVE, WALL)}
+
+
+# State of the HashLife engine: the root node, with the grid in its top left corner, and the size of the grid
+# the root is always the smallest node of level >= 2 covering the grid, so equal grids have equal roots
+# raw keeps the initial grid when it isn't square, so its population and key are those of the full grid
+class HashLifeState:
+    __slots__ = ("root", "size", "raw")
+
+    def __init__(self, root, size, raw=None):
+        self.root = root
+        self.size = size
+        self.raw = raw
+
+
+class HashLifeEngine:
+    name = "hashlife"
+    batched = False
+
+    def __init__(self, max_nodes=2000000):
+        # the caches are cleared when a new grid is loaded and they hold more than max_nodes nodes
+        self.max_nodes = max_nodes
+        self.clear_cache()
+
+    def clear_cache(self):
+        self.nodes = {}
+        self.walls = {0: LEAVES[WALL]}
+        self.successors = {}
+
+    def from_grid(self, grid):
+        if len(self.nodes) > self.max_nodes:
+            self.clear_cache()
+        cells = np.array(grid, dtype=np.uint8)
+        # like the list engine, a grid is treated as len(grid) x len(grid), extra columns are dropped
+        size = cells.shape[0]
+        level = self._root_level(size)
+        universe = np.full((1 << level, 1 << level), WALL, dtype=np.uint8)
+        universe[:size, :size] = cells[:, :size]
+        raw = cells if cells.shape != (size, size) else None
+        return HashLifeState(self._build(universe, 0, 0, level), size, raw)
+
+    def to_array(self, state):
+        if state.raw is not None:
+            return state.raw
+        universe = np.zeros((1 << state.root.level,) * 2, dtype=np.uint8)
+        self._fill(universe, state.root, 0, 0)
+        return universe[:state.size, :state.size]
+
+    def to_grid(self, state):
+        return self.to_array(state).tolist()
+
+    def step(self, state):
+        return self.advance(state, 1)
+
+    # Jump the grid forward by any number of generations, one power of two at a time
+    def advance(self, state, generations):
+        if generations == 0:
+            return state
+        root = state.root
+        j = 0
+        while generations:
+            if generations & 1:
+                # a node of level k can only jump 2^(k-2) generations, grow the universe with walls if needed
+                while root.level < j + 1:
+                    root = self._centre(root)
+                root = self._successor(self._centre(root), j)
+            generations >>= 1
+            j += 1
+        # everything around the grid is wall, shrink the universe back to the root level
+        while root.level > self._root_level(state.size):
+            root = self._join(root.nw.se, root.ne.sw, root.sw.ne, root.se.nw)
+        return HashLifeState(root, state.size)
+
+    def population(self, state):
+        if state.raw is not None:
+            return int(state.raw.sum())
+        return state.root.population
+
+    def key(self, state):
+        if state.raw is not None:
+            return state.raw.shape, state.raw.tobytes()
+        return state.root.digest
+
+    def digest(self, state):
+        if state.raw is not None:
+            return hashlib.blake2b(np.array(state.raw.shape).tobytes() + state.raw.tobytes(), digest_size=DIGEST_SIZE).digest()
+        return state.root.digest
+
+    def _root_level(self, size):
+        return max(2, (size - 1).bit_length())
+
+    def _join(self, nw, ne, sw, se):
+        children = (nw, ne, sw, se)
+        node = self.nodes.get(children)
+        if node is None:
+            node = self.nodes[children] = Node(nw.level + 1, nw, ne, sw, se)
+        return node
+
+    def _wall(self, level):
+        node = self.walls.get(level)
+        if node is None:
+            child = self._wall(level - 1)
+            node = self.walls[level] = self._join(child, child, child, child)
+        return node
+
+    # Node of level k + 1 with the given node of level k in its centre, surrounded by walls
+    def _centre(self, node):
+        wall = self._wall(node.level - 1)
+        return self._join(self._join(wall, wall, wall, node.nw), self._join(wall, wall, node.ne, wall),
+                          self._join(wall, node.sw, wall, wall), self._join(node.se, wall, wall, wall))
+
+    def _build(self, universe, y, x, level):
+        if level == 0:
+            return LEAVES[int(universe[y, x])]
+        half = 1 << (level - 1)
+        region = universe[y:y + 2 * half, x:x + 2 * half]
+        if (region == WALL).all():
+            return self._wall(level)
+        return self._join(self._build(universe, y, x, level - 1), self._build(universe, y, x + half, level - 1),
+                          self._build(universe, y + half, x, level - 1), self._build(universe, y + half, x + half, level - 1))
+
+    def _fill(self, universe, node, y, x):
+        if node.population == 0:
+            return
+        if node.level == 0:
+            universe[y, x] = 1
+            return
+        half = 1 << (node.level - 1)
+        self._fill(universe, node.nw, y, x)
+        self._fill(universe, node.ne, y, x + half)
+        self._fill(universe, node.sw, y + half, x)
+        self._fill(universe, node.se, y + half, x + half)
+
+    # One generation of the centre 2x2 cells of a 4x4 node
+    def _life_4x4(self, node):
+        cells = [[node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+                 [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+                 [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+                 [node.sw.sw, node.sw.se, node.se.sw, node.se.se]]
+        result = []
+        for y, x in ((1, 1), (1, 2), (2, 1), (2, 2)):
+            if cells[y][x].cell == WALL:
+                result.append(LEAVES[WALL])
+                continue
+            live_neighbors = sum(cells[y + dy][x + dx].population for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - cells[y][x].population
+            alive = live_neighbors == 3 or (live_neighbors == 2 and cells[y][x].cell == ALIVE)
+            result.append(LEAVES[ALIVE if alive else DEAD])
+        return self._join(*result)
+
+    # Centre node of level k - 1 of a node of level k, 2^min(j, k - 2) generations later
+    def _successor(self, node, j):
+        j = min(j, node.level - 2)
+        result = self.successors.get((node, j))
+        if result is not None:
+            return result
+        if node.population == 0:
+            # nothing can change without live cells
+            result = self._join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+        elif node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            c1 = self._successor(nw, j)
+            c2 = self._successor(self._join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self._successor(ne, j)
+            c4 = self._successor(self._join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self._successor(self._join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self._successor(self._join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self._successor(sw, j)
+            c8 = self._successor(self._join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self._successor(se, j)
+            if j < node.level - 2:
+                # the 9 sub-nodes are already 2^j generations ahead, keep their centres
+                result = self._join(self._join(c1.se, c2.sw, c4.ne, c5.nw), self._join(c2.se, c3.sw, c5.ne, c6.nw),
+                                    self._join(c4.se, c5.sw, c7.ne, c8.nw), self._join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                # two half jumps of 2^(k-3) generations each
+                result = self._join(self._successor(self._join(c1, c2, c4, c5), j),
+                                    self._successor(self._join(c2, c3, c5, c6), j),
+                                    self._successor(self._join(c4, c5, c7, c8), j),
+                                    self._successor(self._join(c5, c6, c8, c9), j))
+        self.successors[(node, j)] = result
+        return result
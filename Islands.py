@@ -0,0 +1,337 @@
+import base64
+import json
+import multiprocessing
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from GeneticAlgorithm import genetic_algorithm, encode_grid, decode_grid
+from Grid import Grid
+
+# Island model of the genetic algorithm
+# num_islands populations evolve independently, each one in its own process with the usual genetic_algorithm loop.
+# Every migration_interval generations each island sends its migration_size best chromosomes to its neighbours
+# (the next island with the "ring" topology, all the others with "full"), and the chromosomes it receives replace
+# its worst ones. The migrations are synchronous (an island waits for the migrants of its neighbours for the same
+# generation, or for the news that they stopped), so with a seed the results don't depend on the timing.
+#
+# The islands talk through a transport: "queue" (multiprocessing queues, one machine) or "socket" (TCP, one
+# address per island, localhost by default). A transport gives every island an endpoint with
+# start(), send(destination, message), receive(timeout) and close(); a message is (sender, generation, migrants),
+# migrants being a list of (encoded grid, fitness score), or None once the sender stopped.
+
+TOPOLOGIES = ["ring", "full"]
+
+
+# Islands an island sends its migrants to
+def destinations(island, num_islands, topology):
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}', expected one of {TOPOLOGIES}")
+    if num_islands < 2:
+        return []
+    if topology == "ring":
+        return [(island + 1) % num_islands]
+    return [other for other in range(num_islands) if other != island]
+
+
+# Islands an island receives migrants from
+def sources(island, num_islands, topology):
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}', expected one of {TOPOLOGIES}")
+    if num_islands < 2:
+        return []
+    if topology == "ring":
+        return [(island - 1) % num_islands]
+    return [other for other in range(num_islands) if other != island]
+
+
+class QueueTransport:
+    name = "queue"
+
+    def __init__(self, num_islands, context=None):
+        context = context or multiprocessing.get_context()
+        self.inboxes = [context.Queue() for _ in range(num_islands)]
+
+    def endpoint(self, island):
+        return QueueEndpoint(island, self.inboxes)
+
+
+class QueueEndpoint:
+    def __init__(self, island, inboxes):
+        self.island = island
+        self.inboxes = inboxes
+
+    def start(self):
+        pass
+
+    def send(self, destination, message):
+        self.inboxes[destination].put(message)
+
+    def receive(self, timeout=None):
+        return self.inboxes[self.island].get(timeout=timeout)
+
+    def close(self):
+        # the messages sent to islands which already stopped are never read, don't wait for them at exit
+        for inbox in self.inboxes:
+            inbox.cancel_join_thread()
+
+
+# addresses is a list of (host, port), one per island, by default free ports of host are used
+class SocketTransport:
+    name = "socket"
+
+    def __init__(self, num_islands=None, addresses=None, host="127.0.0.1"):
+        if addresses is None:
+            addresses = free_addresses(host, num_islands)
+        self.addresses = [tuple(address) for address in addresses]
+
+    def endpoint(self, island):
+        return SocketEndpoint(island, self.addresses)
+
+
+class SocketEndpoint:
+    def __init__(self, island, addresses, connect_timeout=30.0):
+        self.island = island
+        self.addresses = addresses
+        self.connect_timeout = connect_timeout
+        self.server = None
+        self.connections = {}
+        self.inbox = None
+
+    # Listen on the address of the island, called in the process of the island
+    def start(self):
+        self.inbox = queue.Queue()
+        self.server = socket.create_server(self.addresses[self.island])
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read, args=(connection,), daemon=True).start()
+
+    def _read(self, connection):
+        with connection:
+            while True:
+                header = _receive_exactly(connection, 4)
+                body = header and _receive_exactly(connection, struct.unpack(">I", header)[0])
+                if not body:
+                    return
+                self.inbox.put(decode_message(body))
+
+    def send(self, destination, message):
+        connection = self.connections.get(destination)
+        if connection is None:
+            connection = self.connections[destination] = self._connect(self.addresses[destination])
+        body = encode_message(message)
+        connection.sendall(struct.pack(">I", len(body)) + body)
+
+    # the other islands may not listen yet, retry until connect_timeout
+    def _connect(self, address):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection(address)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def receive(self, timeout=None):
+        return self.inbox.get(timeout=timeout)
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        if self.server is not None:
+            self.server.close()
+
+
+TRANSPORTS = {
+    "queue": QueueTransport,
+    "socket": SocketTransport,
+}
+
+
+def create_transport(transport, num_islands, context=None):
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{transport}', expected one of {sorted(TRANSPORTS)}")
+    if transport == "queue":
+        return QueueTransport(num_islands, context)
+    return SocketTransport(num_islands)
+
+
+# Distinct free TCP ports of host, the sockets are all bound at once so the ports are different
+def free_addresses(host, count):
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind((host, 0))
+        return [s.getsockname() for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def _receive_exactly(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+# Messages are sent as JSON over sockets, the packed grids in base64
+def encode_message(message):
+    sender, generation, migrants = message
+    if migrants is not None:
+        migrants = [[list(shape), base64.b64encode(packed).decode("ascii"), score] for (shape, packed), score in migrants]
+    return json.dumps([sender, generation, migrants]).encode()
+
+
+def decode_message(body):
+    sender, generation, migrants = json.loads(body)
+    if migrants is not None:
+        migrants = [((tuple(shape), base64.b64decode(packed)), (score[0], score[1], tuple(score[2])))
+                    for shape, packed, score in migrants]
+    return sender, generation, migrants
+
+
+# Migration step of one island, passed to genetic_algorithm(migration=...)
+class Migration:
+    def __init__(self, island, num_islands, endpoint, interval=5, size=1, topology="ring", packed=False, timeout=None):
+        if interval < 1:
+            raise ValueError(f"Migration interval must be at least 1, got {interval}")
+        self.island = island
+        self.endpoint = endpoint
+        self.interval = interval
+        self.size = size
+        self.packed = packed
+        self.timeout = timeout
+        self.destinations = destinations(island, num_islands, topology)
+        self.sources = sources(island, num_islands, topology)
+        self.pending = {}
+        self.stopped = set()
+
+    def __call__(self, generation, population):
+        if generation % self.interval or not (self.destinations or self.sources):
+            return
+        # best chromosomes first, the first one of equal fitness scores first
+        order = np.argsort(-population.max_diff[:len(population)], kind="stable")
+        elites = [(encode_grid(population.get(i)), population.score(i)) for i in order[:self.size]]
+        for destination in self.destinations:
+            self.endpoint.send(destination, (self.island, generation, elites))
+
+        migrants = []
+        for source in self.sources:
+            migrants += self._receive(source, generation)
+        # the migrants replace the worst chromosomes, never the elites which were sent
+        replaced = order[::-1][:max(0, len(population) - self.size)]
+        for index, (encoded_grid, score) in zip(replaced, migrants):
+            grid = decode_grid(encoded_grid)
+            population.replace(int(index), Grid.from_list(grid) if self.packed else grid, score)
+
+    # Migrants of source for this generation, an empty list if source stopped before it
+    def _receive(self, source, generation):
+        while (source, generation) not in self.pending and source not in self.stopped:
+            try:
+                sender, message_generation, migrants = self.endpoint.receive(self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"Island {self.island} got no migrants from island {source} for generation {generation}")
+            if migrants is None:
+                self.stopped.add(sender)
+            else:
+                self.pending[sender, message_generation] = migrants
+        return self.pending.pop((source, generation), [])
+
+    # Tell the neighbours this island stopped, they don't wait for its migrants anymore
+    def finish(self):
+        for destination in self.destinations:
+            try:
+                self.endpoint.send(destination, (self.island, None, None))
+            except OSError:
+                pass
+
+
+# Run the genetic algorithm on num_islands islands, returns the result of the island with the best fitness,
+# in the format of genetic_algorithm. The records sent to progress have an extra "island" field.
+# seed makes the run reproducible, island i being seeded with f"{seed}/{i}"
+# timeout is the max time an island waits for the migrants of a neighbour (None waits forever)
+def island_model(num_islands, population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE,
+                 migration_interval=5, migration_size=1, topology="ring", transport="queue", engine=None, seed=None,
+                 cycle_detection="hash", packed=False, progress=None, timeout=None):
+    if num_islands < 1:
+        raise ValueError(f"Number of islands must be at least 1, got {num_islands}")
+    context = multiprocessing.get_context()
+    if isinstance(transport, str):
+        transport = create_transport(transport, num_islands, context)
+    results = context.Queue()
+    shutdown = context.Event()
+    parameters = (population_size, grid_size, max_generations, stabilization_generations, MUTATION_RATE)
+    options = {"engine": engine, "cycle_detection": cycle_detection, "packed": packed}
+
+    processes = []
+    for island in range(num_islands):
+        migration = Migration(island, num_islands, transport.endpoint(island), migration_interval, migration_size,
+                              topology, packed, timeout)
+        island_seed = None if seed is None else f"{seed}/{island}"
+        process = context.Process(target=_run_island, daemon=True,
+                                  args=(island, parameters, options, island_seed, migration, results, shutdown,
+                                        progress is not None))
+        process.start()
+        processes.append(process)
+
+    island_results = [None] * num_islands
+    try:
+        remaining = num_islands
+        while remaining:
+            try:
+                kind, island, payload = results.get(timeout=1.0)
+            except queue.Empty:
+                # the islands only exit after the shutdown, a dead island crashed
+                for island, process in enumerate(processes):
+                    if island_results[island] is None and not process.is_alive():
+                        raise RuntimeError(f"Island {island} exited with code {process.exitcode}")
+                continue
+            if kind == "progress":
+                progress(dict(payload, island=island))
+            elif kind == "error":
+                raise RuntimeError(f"Island {island} failed:\n{payload}")
+            else:
+                island_results[island] = payload
+                remaining -= 1
+    finally:
+        shutdown.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    return max(island_results, key=lambda result: result[1][1])
+
+
+# Process of one island: the islands wait for the shutdown before closing their endpoint,
+# so the migrants and stop messages sent to an island which already finished never fail
+def _run_island(island, parameters, options, seed, migration, results, shutdown, report_progress):
+    migration.endpoint.start()
+    try:
+        # without a seed every island still needs its own random state, not the one of the parent process
+        random.seed(seed)
+        progress = (lambda record: results.put(("progress", island, record))) if report_progress else None
+        result = genetic_algorithm(*parameters, progress=progress, migration=migration, **options)
+        results.put(("result", island, result))
+    except Exception:
+        results.put(("error", island, traceback.format_exc()))
+    finally:
+        migration.finish()
+        shutdown.wait()
+        migration.endpoint.close()
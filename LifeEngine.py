@@ -0,0 +1,261 @@
+import hashlib
+
+import numpy as np
+
+from Grid import Grid
+from HashLife import HashLifeEngine
+
+# Step engines for the Game of Life.
+# Every engine works on its own internal "state" representation and exposes the same small interface:
+#   from_grid(grid)   -> state   (grid is the list of lists of 0s and 1s used everywhere else)
+#   to_grid(state)    -> grid
+#   to_array(state)   -> the grid as a 2D NumPy uint8 array (not to be modified, it can be the state itself)
+#   step(state)       -> state   (one generation, cells outside the grid are always dead)
+#   population(state) -> number of live cells
+#   key(state)        -> hashable value identifying the state exactly
+#   digest(state)     -> fixed-size digest of the state, used for cycle detection
+# Engines able to jump ahead (HashLife) also provide advance(state, generations)
+# All engines produce exactly the same generations as the original list implementation.
+
+DIGEST_SIZE = 16
+
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+# Function to count live neighbors of a cell
+def count_live_neighbors(grid, x, y):
+    count = 0
+    grid_size = len(grid)
+    for dx, dy in DIRECTIONS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < grid_size and 0 <= ny < grid_size:
+            count += grid[ny][nx]
+    return count
+
+
+# 128 bit digest of a grid given as a NumPy array: its shape followed by its cells packed 8 per byte
+def grid_digest(cells):
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(np.array(cells.shape, dtype=np.int64).tobytes())
+    digest.update(np.packbits(cells).tobytes())
+    return digest.digest()
+
+
+# Reference engine working directly on lists of lists, cell by cell
+class ListEngine:
+    name = "list"
+    batched = False
+
+    def from_grid(self, grid):
+        if isinstance(grid, np.ndarray):
+            return grid.tolist()
+        return [list(row) for row in grid]
+
+    def to_grid(self, state):
+        return [list(row) for row in state]
+
+    def to_array(self, state):
+        return np.array(state, dtype=np.uint8)
+
+    def step(self, state):
+        grid_size = len(state)
+        new_grid = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
+        for y in range(grid_size):
+            for x in range(grid_size):
+                live_neighbors = count_live_neighbors(state, x, y)
+                if state[y][x] == 1:
+                    if live_neighbors in [2, 3]:
+                        new_grid[y][x] = 1
+                else:
+                    if live_neighbors == 3:
+                        new_grid[y][x] = 1
+        return new_grid
+
+    def population(self, state):
+        return sum(sum(row) for row in state)
+
+    def key(self, state):
+        return tuple(tuple(row) for row in state)
+
+    def digest(self, state):
+        return grid_digest(np.array(state, dtype=np.uint8))
+
+
+# One generation of a NumPy uint8 array of shape (..., rows, cols), cells outside the array are dead
+def life_step(cells):
+    rows, cols = cells.shape[-2:]
+    padded = np.pad(cells, [(0, 0)] * (cells.ndim - 2) + [(1, 1), (1, 1)])
+    neighbors = np.zeros(cells.shape, dtype=np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy == 1 and dx == 1:
+                continue
+            neighbors += padded[..., dy:dy + rows, dx:dx + cols]
+    alive = (neighbors == 3) | ((cells == 1) & (neighbors == 2))
+    return alive.astype(np.uint8)
+
+
+# Vectorized engine: the grid is a NumPy uint8 array and the neighbour count
+# is the sum of the 8 shifted slices of a zero padded copy (the zero border keeps the dead-border semantics)
+# step also accepts a stack of grids of shape (..., N, N) and advances all of them at once
+class NumpyEngine:
+    name = "numpy"
+    batched = True
+
+    def from_grid(self, grid):
+        return np.array(grid, dtype=np.uint8)
+
+    def to_grid(self, state):
+        return state.tolist()
+
+    def to_array(self, state):
+        return state
+
+    def step(self, state):
+        # like the list engine, a grid is treated as len(grid) x len(grid), extra columns are dropped
+        return life_step(state[..., :state.shape[-2]])
+
+    def population(self, state):
+        return int(state.sum())
+
+    def key(self, state):
+        return state.tobytes()
+
+    def digest(self, state):
+        return grid_digest(state)
+
+
+# Active region engine for mostly empty grids: the state only keeps the bounding box of the live cells,
+# as a tuple (shape, top, left, box) where box is a NumPy uint8 array always trimmed to the live cells
+# A generation only computes the box grown by one cell on each side (clipped to the grid),
+# so its cost follows the size of the pattern instead of the area of the grid
+class ActiveRegionEngine:
+    name = "sparse"
+    batched = False
+
+    def from_grid(self, grid):
+        cells = np.array(grid, dtype=np.uint8)
+        return self._trim(cells.shape, 0, 0, cells)
+
+    def to_grid(self, state):
+        return self.to_array(state).tolist()
+
+    def to_array(self, state):
+        shape, top, left, box = state
+        cells = np.zeros(shape, dtype=np.uint8)
+        cells[top:top + box.shape[0], left:left + box.shape[1]] = box
+        return cells
+
+    def step(self, state):
+        shape, top, left, box = state
+        # like the list engine, a grid is treated as len(grid) x len(grid), extra columns are dropped
+        size = shape[0]
+        box = box[:, :max(0, size - left)]
+        if not box.any():
+            return (size, size), 0, 0, np.zeros((0, 0), dtype=np.uint8)
+        height, width = box.shape
+        region_top, region_left = max(top - 1, 0), max(left - 1, 0)
+        region_bottom, region_right = min(top + height + 1, size), min(left + width + 1, size)
+        region = np.zeros((region_bottom - region_top, region_right - region_left), dtype=np.uint8)
+        region[top - region_top:top - region_top + height, left - region_left:left - region_left + width] = box
+        return self._trim((size, size), region_top, region_left, life_step(region))
+
+    def population(self, state):
+        return int(state[3].sum())
+
+    def key(self, state):
+        shape, top, left, box = state
+        return shape, top, left, box.shape, box.tobytes()
+
+    def digest(self, state):
+        shape, top, left, box = state
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        digest.update(np.array(shape + (top, left), dtype=np.int64).tobytes())
+        digest.update(grid_digest(box))
+        return digest.digest()
+
+    # Cut a region of the grid at (top, left) down to the bounding box of its live cells
+    def _trim(self, shape, top, left, region):
+        rows = np.flatnonzero(region.any(axis=1))
+        if rows.size == 0:
+            return shape, 0, 0, np.zeros((0, 0), dtype=np.uint8)
+        cols = np.flatnonzero(region.any(axis=0))
+        box = region[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        return shape, top + int(rows[0]), left + int(cols[0]), box
+
+
+# Bitboard engine: the state is a Grid (one int per row) and the 8 neighbours of all the cells of a row
+# are added together with bitwise full adders into 3 bit planes (a count of 8 wraps to 0, which is dead anyway)
+class BitboardEngine:
+    name = "bitboard"
+    batched = False
+
+    def from_grid(self, grid):
+        return Grid.from_list(grid)
+
+    def to_grid(self, state):
+        return state.tolist()
+
+    def to_array(self, state):
+        return state.to_array()
+
+    def step(self, state):
+        # like the list engine, a grid is treated as len(grid) x len(grid), extra columns are dropped
+        size = len(state.rows)
+        mask = (1 << size) - 1
+        rows = [row & mask for row in state.rows]
+        new_rows = []
+        above = 0
+        for y in range(size):
+            current = rows[y]
+            below = rows[y + 1] if y + 1 < size else 0
+            s0 = s1 = s2 = 0
+            for neighbors in ((above << 1) & mask, above, above >> 1,
+                              (current << 1) & mask, current >> 1,
+                              (below << 1) & mask, below, below >> 1):
+                carry0 = s0 & neighbors
+                s0 ^= neighbors
+                carry1 = s1 & carry0
+                s1 ^= carry0
+                s2 ^= carry1
+            # alive with exactly 3 neighbours, or alive with 2 neighbours
+            new_rows.append(s1 & ~s2 & (s0 | current) & mask)
+            above = current
+        return Grid(new_rows, size)
+
+    def population(self, state):
+        return state.population()
+
+    def key(self, state):
+        return state.width, tuple(state.rows)
+
+    def digest(self, state):
+        row_bytes = (state.width + 7) // 8
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        digest.update(np.array((len(state.rows), state.width), dtype=np.int64).tobytes())
+        for row in state.rows:
+            digest.update(row.to_bytes(row_bytes, "little"))
+        return digest.digest()
+
+
+ENGINES = {
+    ListEngine.name: ListEngine(),
+    NumpyEngine.name: NumpyEngine(),
+    BitboardEngine.name: BitboardEngine(),
+    ActiveRegionEngine.name: ActiveRegionEngine(),
+    HashLifeEngine.name: HashLifeEngine(),
+}
+
+DEFAULT_ENGINE = NumpyEngine.name
+
+
+# Return an engine instance given its name, an engine instance, or None for the default engine
+def get_engine(engine=None):
+    if engine is None:
+        engine = DEFAULT_ENGINE
+    if isinstance(engine, str):
+        try:
+            return ENGINES[engine]
+        except KeyError:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {sorted(ENGINES)}")
+    return engine
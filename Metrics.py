@@ -0,0 +1,91 @@
+import json
+import time
+
+# Progress metrics of the genetic algorithm
+# genetic_algorithm(progress=...) calls progress(record) once per generation with a dict:
+#   generation               0 for the initial population, then 1, 2, ...
+#   population_size          number of evaluated chromosomes
+#   best_fitness             fitness (max_diff) of the best chromosome
+#   average_fitness          average fitness of the generation
+#   selection_seconds        time spent in selection
+#   variation_seconds        time spent in crossover and mutation
+#   evaluation_seconds       time spent evaluating the fitness
+#   on_generation_seconds    time spent in the on_generation callback
+#   migration_seconds        time spent in migrations, waiting for the migrants of other islands included
+#   checkpoint_seconds       time spent writing the checkpoint
+#   evaluated                number of chromosomes actually simulated (the others came from the cache)
+#   cell_updates_per_second  simulated generations x grid cells / evaluation time
+#   cache_hit_rate           hit rate of the fitness cache during the generation (only with a cache)
+#   island                   island of the record (only with the island model, see Islands.py)
+# Without a progress callback none of this is computed.
+
+
+# Write every record as one JSON line
+class JsonlMetricsSink:
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def __call__(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Print one short line per generation
+def print_progress(record):
+    island = f"Island {record['island']}, " if "island" in record else ""
+    print(f"{island}Generation {record['generation']}: best fitness {record['best_fitness']}, "
+          f"average fitness {record['average_fitness']}, {record['evaluation_seconds']:.2f}s evaluation, "
+          f"{record['cell_updates_per_second']:.3g} cell updates/s")
+
+
+# Send every record to several sinks
+def combine_sinks(*sinks):
+    sinks = [sink for sink in sinks if sink is not None]
+    if not sinks:
+        return None
+
+    def progress(record):
+        for sink in sinks:
+            sink(record)
+    return progress
+
+
+# Counts what the evaluation of the population simulated, wrapped around the function evaluating the fitness
+class EvaluationCounter:
+    def __init__(self, evaluate, grid_size):
+        self.evaluate = evaluate
+        self.cells = grid_size * grid_size
+        self.evaluated = 0
+        self.cell_updates = 0
+
+    def __call__(self, population):
+        scores = self.evaluate(population)
+        self.evaluated += len(population)
+        # fitness reports the generations simulated, except for the invalid grids (max_diff == 0) which count for 0
+        self.cell_updates += sum(score[0] for score in scores) * self.cells
+        return scores
+
+    def reset(self):
+        self.evaluated = 0
+        self.cell_updates = 0
+
+
+# Timer of the phases of one generation
+class GenerationTimer:
+    def __init__(self):
+        self.timings = {}
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.timings[phase] = now - self.last
+        self.last = now
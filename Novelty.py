@@ -0,0 +1,132 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Novelty archive: keeps the chromosomes already evaluated and skips the near-duplicates of them before simulating,
+# so the evaluations go to novel candidates instead of the near-clones of the best chromosome that elitism and
+# roulette selection fill the population with.
+#
+# Signature of a chromosome, computed without simulating it:
+#   - its live cells relative to their bounding box (so translated copies are the same pattern)
+#   - a MinHash sketch of these cells, num_hashes values whose agreement estimates the Jaccard similarity
+# The sketches are split into 'bands' bands for locality-sensitive hashing: two patterns are compared only when
+# they share a band, and a pattern is a near-duplicate when the Jaccard similarity of its cells with an archived
+# pattern is at least 'threshold'. Identical grids get their archived fitness back, near-duplicates get the
+# fitness (0, 0, (cells, cells, 0)) of an invalid grid, so they are dropped from the next selection.
+
+MERSENNE_PRIME = (1 << 31) - 1
+COORDINATE_BASE = 1 << 20
+
+
+class NoveltyArchive:
+    def __init__(self, threshold=0.9, num_hashes=32, bands=8, maxsize=100000, seed=0):
+        if num_hashes % bands:
+            raise ValueError(f"num_hashes ({num_hashes}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_hashes // bands
+        self.maxsize = maxsize
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(1, MERSENNE_PRIME, size=(num_hashes, 1), dtype=np.int64)
+        self.hash_b = rng.integers(0, MERSENNE_PRIME, size=(num_hashes, 1), dtype=np.int64)
+        # archived patterns: key -> (cells, band keys, fitness), and band key -> keys of the patterns in that band
+        self.entries = OrderedDict()
+        self.buckets = {}
+        self.skipped = 0
+        self.evaluated = 0
+        self.reused = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Exact key of a grid (its shape and its cells) and the live cells relative to their bounding box
+    def signature(self, grid, max_generations):
+        cells = np.asarray(grid, dtype=np.uint8)
+        key = (cells.shape, np.packbits(cells).tobytes(), max_generations)
+        rows, cols = np.nonzero(cells)
+        if rows.size == 0:
+            return key, None, ()
+        ids = (rows - rows.min()).astype(np.int64) * COORDINATE_BASE + (cols - cols.min())
+        minhash = ((self.hash_a * ids + self.hash_b) % MERSENNE_PRIME).min(axis=1)
+        band_keys = tuple((band, minhash[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+                          for band in range(self.bands))
+        return key, frozenset(ids.tolist()), band_keys
+
+    # Archived pattern most similar to the given signature, as (similarity, fitness), or None if none shares a band
+    def nearest(self, cells, band_keys):
+        candidates = set()
+        for band_key in band_keys:
+            candidates.update(self.buckets.get(band_key, ()))
+        best = None
+        for key in candidates:
+            other_cells, _, score = self.entries[key]
+            similarity = len(cells & other_cells) / len(cells | other_cells)
+            if best is None or similarity > best[0]:
+                best = (similarity, score)
+        return best
+
+    def add(self, key, cells, band_keys, score):
+        if key in self.entries:
+            return
+        self.entries[key] = (cells, band_keys, score)
+        for band_key in band_keys:
+            self.buckets.setdefault(band_key, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            old_key, (_, old_band_keys, _) = self.entries.popitem(last=False)
+            for band_key in old_band_keys:
+                bucket = self.buckets[band_key]
+                bucket.discard(old_key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    # Evaluate a population through evaluate(grids), simulating only the grids which aren't near-duplicates of
+    # an archived grid or of a grid before them in the population
+    def evaluate(self, population, max_generations, evaluate):
+        scores = [None] * len(population)
+        pending = OrderedDict()  # key -> indices of the grids to simulate
+        for i, grid in enumerate(population):
+            key, cells, band_keys = self.signature(grid, max_generations)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            archived = self.entries.get(key)
+            if archived is not None:
+                scores[i] = archived[2]
+                self.reused += 1
+                continue
+            if cells is not None:
+                nearest = self.nearest(cells, band_keys)
+                if nearest is not None and nearest[0] >= self.threshold:
+                    scores[i] = (0, 0, (len(cells), len(cells), 0))
+                    self.skipped += 1
+                    continue
+            # archived before it is simulated, so its near-duplicates later in the population are skipped
+            self.add(key, cells, band_keys, None)
+            pending[key] = [i]
+        if pending:
+            new_scores = evaluate([population[indices[0]] for indices in pending.values()])
+            self.evaluated += len(pending)
+            for (key, indices), score in zip(pending.items(), new_scores):
+                for i in indices:
+                    scores[i] = score
+                if key in self.entries:
+                    cells, band_keys, _ = self.entries[key]
+                    self.entries[key] = (cells, band_keys, score)
+        return scores
+
+    # Archived keys and scores with the counters, for checkpoints (the signatures are computed again by restore)
+    def state(self):
+        return {"entries": [(key, score) for key, (_, _, score) in self.entries.items()],
+                "evaluated": self.evaluated, "skipped": self.skipped, "reused": self.reused}
+
+    def restore(self, state):
+        self.entries = OrderedDict()
+        self.buckets = {}
+        for (shape, packed, max_generations), score in state["entries"]:
+            grid = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=shape[0] * shape[1]).reshape(shape)
+            key, cells, band_keys = self.signature(grid, max_generations)
+            self.add(key, cells, band_keys, score)
+        self.evaluated, self.skipped, self.reused = state["evaluated"], state["skipped"], state["reused"]
+
+    def stats(self):
+        return {"size": len(self.entries), "evaluated": self.evaluated, "skipped": self.skipped, "reused": self.reused}
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import struct
+
+import numpy as np
+
+# Chromosome file formats
+#   .json  list of lists of 0s and 1s (the original "Save Chromosome" format, see sample.json)
+#   .rle   the standard Run Length Encoded format of Life patterns (x = width, y = height, rule = B3/S23)
+#   .gol   packed binary: a header (magic, version, height, width) and the cells packed 8 per byte
+# save_pattern / load_pattern pick the format from the file extension, or use 'pattern' ("json", "rle" or "packed")
+# for other extensions, grids are loaded as lists of lists.
+
+RULE = "B3/S23"
+RLE_LINE_LENGTH = 70
+PACKED_MAGIC = b"GOLP"
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct("<4sBII")
+PATTERN_FORMATS = {".json": "json", ".rle": "rle", ".gol": "packed"}
+
+
+# Runs (length, cell) of a row, without its trailing dead cells
+def _runs(row):
+    alive = np.flatnonzero(row)
+    if alive.size == 0:
+        return []
+    row = row[:alive[-1] + 1].astype(np.int8)
+    starts = np.flatnonzero(np.diff(row, prepend=np.int8(-1)))
+    lengths = np.diff(np.append(starts, row.size))
+    return [(int(length), int(row[start])) for start, length in zip(starts, lengths)]
+
+
+def to_rle(grid, comment=None):
+    cells = np.asarray(grid, dtype=np.uint8)
+    height, width = cells.shape
+    tokens = []
+    last_row = 0
+    for y, row in enumerate(cells):
+        runs = _runs(row)
+        if not runs:
+            continue
+        # '$' ends a row, n$ also skips the empty rows in between
+        if y > last_row:
+            tokens.append(f"{y - last_row if y - last_row > 1 else ''}$")
+        tokens += [f"{length if length > 1 else ''}{'o' if cell else 'b'}" for length, cell in runs]
+        last_row = y
+    tokens.append("!")
+
+    lines = [f"#C {line}" for line in comment.splitlines()] if comment else []
+    lines.append(f"x = {width}, y = {height}, rule = {RULE}")
+    line = ""
+    for token in tokens:
+        if len(line) + len(token) > RLE_LINE_LENGTH:
+            lines.append(line)
+            line = ""
+        line += token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def from_rle(text):
+    width = height = None
+    body = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if width is None:
+            header = dict(field.split("=", 1) for field in line.replace(" ", "").split(","))
+            try:
+                width, height = int(header["x"]), int(header["y"])
+            except (KeyError, ValueError):
+                raise ValueError(f"Invalid RLE header '{line}'")
+            rule = header.get("rule", RULE).upper()
+            if rule not in (RULE, "23/3", "S23/B3"):
+                raise ValueError(f"Unsupported rule '{rule}', only {RULE} is supported")
+            continue
+        body.append(line)
+        if "!" in line:
+            break
+    if width is None:
+        raise ValueError("Missing RLE header")
+
+    cells = np.zeros((height, width), dtype=np.uint8)
+    x = y = 0
+    for count, tag in re.findall(r"(\d*)([a-zA-Z$!])", "".join(body)):
+        count = int(count) if count else 1
+        if tag == "!":
+            break
+        if tag == "$":
+            x, y = 0, y + count
+            continue
+        if x + count > width or y >= height:
+            raise ValueError(f"RLE pattern exceeds its size {width}x{height}")
+        # every state other than b (dead) is alive in a two states rule
+        cells[y, x:x + count] = tag != "b"
+        x += count
+    return cells.tolist()
+
+
+def to_packed(grid):
+    cells = np.asarray(grid, dtype=np.uint8)
+    height, width = cells.shape
+    return PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, height, width) + np.packbits(cells).tobytes()
+
+
+def from_packed(data):
+    if len(data) < PACKED_HEADER.size:
+        raise ValueError("Not a packed chromosome file")
+    magic, version, height, width = PACKED_HEADER.unpack_from(data)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError("Not a packed chromosome file")
+    packed = np.frombuffer(data, dtype=np.uint8, offset=PACKED_HEADER.size)
+    if len(packed) * 8 < height * width:
+        raise ValueError(f"Packed chromosome file truncated, {height}x{width} cells don't fit in {len(packed)} bytes")
+    return np.unpackbits(packed, count=height * width).reshape(height, width).tolist()
+
+
+# The engines simulate a grid as len(grid) x len(grid), a pattern which isn't square (RLE files are sized to the
+# pattern) is padded with dead cells on the right or the bottom into a square grid of at least 'size' cells
+def square_grid(grid, size=0):
+    cells = np.asarray(grid, dtype=np.uint8)
+    height, width = cells.shape
+    size = max(size, height, width)
+    if (height, width) == (size, size):
+        return cells.tolist()
+    square = np.zeros((size, size), dtype=np.uint8)
+    square[:height, :width] = cells
+    return square.tolist()
+
+
+# Format of a file from its extension, 'default' for unknown extensions (an error if it is None)
+def pattern_format(path, default=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in PATTERN_FORMATS:
+        if default is not None:
+            return default
+        raise ValueError(f"Unknown chromosome file extension '{extension}', expected one of {sorted(PATTERN_FORMATS)}")
+    return PATTERN_FORMATS[extension]
+
+
+def save_pattern(path, grid, pattern=None):
+    pattern = pattern_format(path, pattern)
+    if pattern == "packed":
+        with open(path, "wb") as f:
+            f.write(to_packed(grid))
+    elif pattern == "rle":
+        with open(path, "w") as f:
+            f.write(to_rle(grid))
+    else:
+        with open(path, "w") as f:
+            json.dump(np.asarray(grid, dtype=np.uint8).tolist(), f)
+
+
+def load_pattern(path, pattern=None):
+    pattern = pattern_format(path, pattern)
+    if pattern == "packed":
+        with open(path, "rb") as f:
+            return from_packed(f.read())
+    with open(path) as f:
+        if pattern == "rle":
+            return from_rle(f.read())
+        return json.load(f)
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+
+# Append-only library of chromosomes with their fitness, for archiving the patterns of many runs
+# A library is a directory with two files:
+#   patterns.bin  the cells of every chromosome packed 8 per byte, one after the other
+#   index.bin     one fixed-size record per chromosome (INDEX_DTYPE): where its cells are, its shape,
+#                 its fitness tuple, its period (-1 when unknown) and its population (live cells)
+# Both files only grow. The index is read through a memory map, so queries on millions of chromosomes are
+# vectorized NumPy filters, and a chromosome is only unpacked when it is read.
+# The cells are written before the index record, an interrupted append leaves at most unused bytes in patterns.bin.
+
+LIBRARY_MAGIC = b"GOLLIB1\n"
+INDEX_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("height", "<i4"),
+    ("width", "<i4"),
+    ("generations", "<i8"),
+    ("max_diff", "<i8"),
+    ("initial_alive_cells", "<i8"),
+    ("final_alive_cells", "<i8"),
+    ("max_diff_gen", "<i8"),
+    ("period", "<i8"),
+    ("population", "<i8"),
+])
+
+
+class PatternLibrary:
+    def __init__(self, path):
+        self.path = path
+        self.patterns_path = os.path.join(path, "patterns.bin")
+        self.index_path = os.path.join(path, "index.bin")
+        os.makedirs(path, exist_ok=True)
+        for file_path in (self.patterns_path, self.index_path):
+            if not os.path.exists(file_path):
+                with open(file_path, "wb") as f:
+                    f.write(LIBRARY_MAGIC)
+            else:
+                with open(file_path, "rb") as f:
+                    if f.read(len(LIBRARY_MAGIC)) != LIBRARY_MAGIC:
+                        raise ValueError(f"{file_path} is not a pattern library file")
+        self._index = None
+        self._patterns = None
+
+    def __len__(self):
+        return len(self.index)
+
+    # Index records of all the chromosomes, memory mapped (a record cut by an interrupted append is ignored)
+    @property
+    def index(self):
+        count = (os.path.getsize(self.index_path) - len(LIBRARY_MAGIC)) // INDEX_DTYPE.itemsize
+        if self._index is None or len(self._index) != count:
+            if count == 0:
+                self._index = np.zeros(0, dtype=INDEX_DTYPE)
+            else:
+                self._index = np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", offset=len(LIBRARY_MAGIC), shape=(count,))
+        return self._index
+
+    def append(self, grid, fitness, period=None):
+        return self.extend([grid], [fitness], None if period is None else [period])[0]
+
+    # Append many chromosomes with their fitness tuples (and periods), returns their indices
+    def extend(self, grids, fitness_scores, periods=None):
+        records = np.zeros(len(grids), dtype=INDEX_DTYPE)
+        chunks = []
+        with open(self.patterns_path, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for i, (grid, score) in enumerate(zip(grids, fitness_scores)):
+                cells = np.asarray(grid, dtype=np.uint8)
+                packed = np.packbits(cells).tobytes()
+                records[i] = (offset, cells.shape[0], cells.shape[1], score[0], score[1], score[2][0], score[2][1], score[2][2],
+                              -1 if periods is None or periods[i] is None else periods[i], int(cells.sum()))
+                chunks.append(packed)
+                offset += len(packed)
+            f.write(b"".join(chunks))
+        first = len(self)
+        with open(self.index_path, "r+b") as f:
+            # drop a record cut by an interrupted append
+            f.seek(len(LIBRARY_MAGIC) + first * INDEX_DTYPE.itemsize)
+            f.truncate()
+            f.write(records.tobytes())
+        return list(range(first, first + len(records)))
+
+    def get(self, index):
+        return self.get_array(index).tolist()
+
+    def get_array(self, index):
+        record = self.index[index]
+        height, width = int(record["height"]), int(record["width"])
+        start = int(record["offset"])
+        end = start + (height * width + 7) // 8
+        # mapped again when the file grew since it was mapped
+        if self._patterns is None or len(self._patterns) < end:
+            self._patterns = np.memmap(self.patterns_path, dtype=np.uint8, mode="r")
+        return np.unpackbits(self._patterns[start:end], count=height * width).reshape(height, width)
+
+    def fitness(self, index):
+        record = self.index[index]
+        return (int(record["generations"]), int(record["max_diff"]),
+                (int(record["initial_alive_cells"]), int(record["final_alive_cells"]), int(record["max_diff_gen"])))
+
+    # Indices of the chromosomes matching every given bound (inclusive), in the order they were added
+    def find(self, min_fitness=None, max_fitness=None, period=None, min_population=None, max_population=None,
+             min_generations=None, max_generations=None):
+        index = self.index
+        selected = np.ones(len(index), dtype=bool)
+        for field, low, high in (("max_diff", min_fitness, max_fitness), ("population", min_population, max_population),
+                                 ("generations", min_generations, max_generations), ("period", period, period)):
+            if low is not None:
+                selected &= index[field] >= low
+            if high is not None:
+                selected &= index[field] <= high
+        return np.flatnonzero(selected).tolist()
+
+    # Indices of the 'count' chromosomes with the highest value of a field (max_diff by default)
+    def best(self, count=10, key="max_diff"):
+        values = np.asarray(self.index[key])
+        order = np.argsort(-values, kind="stable")
+        return order[:count].tolist()
@@ -0,0 +1,123 @@
+import numpy as np
+
+from Grid import copy_grid
+
+# Population stores of the genetic algorithm
+# The chromosomes are addressed by index: the offspring of a generation are written into a second buffer,
+# which becomes the current population with swap(), and the fitness scores are kept in parallel arrays
+# (generations, max_diff, initial_alive_cells, final_alive_cells, max_diff_gen).
+# ArrayPopulation keeps all the chromosomes in one preallocated (2, capacity, N, N) uint8 buffer, so nothing is
+# allocated or deep copied during the run. ListPopulation keeps lists of grids, for the packed Grid chromosomes.
+# The chromosomes of the current population are never modified, children are always written to the next buffer.
+
+
+class Population:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.next_size = 0
+        self.generations = np.zeros(capacity, dtype=np.int64)
+        self.max_diff = np.zeros(capacity, dtype=np.int64)
+        self.initial_alive_cells = np.zeros(capacity, dtype=np.int64)
+        self.final_alive_cells = np.zeros(capacity, dtype=np.int64)
+        self.max_diff_gen = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    # Store the fitness tuples of the current population, as returned by fitness
+    def set_scores(self, fitness_scores):
+        size = len(fitness_scores)
+        self.generations[:size] = [score[0] for score in fitness_scores]
+        self.max_diff[:size] = [score[1] for score in fitness_scores]
+        self.initial_alive_cells[:size] = [score[2][0] for score in fitness_scores]
+        self.final_alive_cells[:size] = [score[2][1] for score in fitness_scores]
+        self.max_diff_gen[:size] = [score[2][2] for score in fitness_scores]
+
+    def score(self, index):
+        return (int(self.generations[index]), int(self.max_diff[index]),
+                (int(self.initial_alive_cells[index]), int(self.final_alive_cells[index]), int(self.max_diff_gen[index])))
+
+    def scores(self, indices=None):
+        return [self.score(i) for i in (range(self.size) if indices is None else indices)]
+
+    # Replace a chromosome of the current population, together with its fitness score
+    def replace(self, index, grid, score):
+        self.current[index] = grid
+        self.generations[index], self.max_diff[index] = score[0], score[1]
+        self.initial_alive_cells[index], self.final_alive_cells[index], self.max_diff_gen[index] = score[2]
+
+    # Indices of the chromosomes which didn't reach max_generations and have a fitness score
+    def survivors(self, max_generations):
+        generations, max_diff = self.generations[:self.size], self.max_diff[:self.size]
+        return np.flatnonzero((generations < max_generations) & (max_diff != 0)).tolist()
+
+    # Start writing the next generation, made of 'size' chromosomes
+    def start_generation(self, size):
+        if size > self.capacity:
+            raise ValueError(f"{size} chromosomes don't fit in a population of capacity {self.capacity}")
+        self.next_size = size
+
+    # The next generation becomes the current one
+    def swap(self):
+        self.current, self.next = self.next, self.current
+        self.size = self.next_size
+
+
+class ArrayPopulation(Population):
+    def __init__(self, grids, capacity=None):
+        grids = np.array(grids, dtype=np.uint8)
+        super().__init__(max(capacity or 0, len(grids)))
+        self.buffers = np.zeros((2, self.capacity) + grids.shape[1:], dtype=np.uint8)
+        self.current, self.next = self.buffers
+        self.current[:len(grids)] = grids
+        self.size = len(grids)
+
+    # The current chromosomes, as a view of the buffer
+    def grids(self):
+        return self.current[:self.size]
+
+    def get(self, index):
+        return self.current[index]
+
+    # Copy of a chromosome which stays valid after the buffers are swapped
+    def copy(self, index):
+        return self.current[index].copy()
+
+    # Slot 'index' of the next generation, holding a copy of the chromosome 'parent' to modify in place
+    def child(self, index, parent):
+        child = self.next[index]
+        child[...] = self.current[parent]
+        return child
+
+    def set_child(self, index, grid):
+        self.next[index] = grid
+
+
+class ListPopulation(Population):
+    def __init__(self, grids, capacity=None):
+        super().__init__(max(capacity or 0, len(grids)))
+        self.current = list(grids)
+        self.next = []
+        self.size = len(grids)
+
+    def grids(self):
+        return self.current[:self.size]
+
+    def get(self, index):
+        return self.current[index]
+
+    # the current chromosomes are never modified, so they can be shared
+    def copy(self, index):
+        return self.current[index]
+
+    def start_generation(self, size):
+        super().start_generation(size)
+        self.next = [None] * size
+
+    def child(self, index, parent):
+        child = self.next[index] = copy_grid(self.current[parent])
+        return child
+
+    def set_child(self, index, grid):
+        self.next[index] = grid
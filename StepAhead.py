@@ -0,0 +1,135 @@
+import threading
+from collections import deque
+
+from HashLife import HashLifeEngine
+from LifeEngine import get_engine
+
+# Step-ahead buffer of a simulation: a background thread computes the next frames of a grid with a step engine
+# and keeps up to 'capacity' of them in a ring, so displaying a frame never waits for the simulation.
+# A frame is (generation, cells), cells being the grid as a NumPy array, every frame is 'stride' generations
+# after the previous one. jump(generation) restarts the buffer at any generation: the state is advanced with the
+# engine's advance() when it has one, with the engine's step otherwise, and from the initial grid when jumping
+# backwards.
+# hashlife_jump (None by default) sends the jumps and strides of at least that many generations through HashLife.
+# It only pays off for patterns HashLife memoizes well (small or repetitive ones): rebuilding the quadtree of a
+# large or chaotic grid costs far more than stepping it, so it is opt-in. The HashLife state of the last jump is
+# kept, consecutive frames don't rebuild it.
+
+CANCEL_CHECK_STEPS = 256  # steps between two checks that a jump wasn't replaced or the buffer closed
+
+
+class StepAheadBuffer:
+    def __init__(self, grid, engine=None, capacity=64, stride=1, start_generation=0, hashlife_jump=None):
+        self.engine = get_engine(engine)
+        self.capacity = capacity
+        self.stride = stride
+        self.initial = (start_generation, self.engine.from_grid(grid))
+        # last frame returned by poll(), and last state computed by the thread
+        self.current = self.initial
+        self.computed = self.initial
+        self.frames = deque()
+        self.jump_target = None
+        # incremented whenever the buffered frames are dropped, results computed before are discarded
+        self.epoch = 0
+        self.closed = False
+        self.hashlife_jump = hashlife_jump
+        self.hashlife = None
+        # (engine state, HashLife state) of the last HashLife jump
+        self.hashlife_state = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def generation(self):
+        return self.current[0]
+
+    # Next frame, or None if it isn't computed yet
+    def poll(self):
+        with self.condition:
+            if not self.frames:
+                return None
+            generation, state, cells = self.frames.popleft()
+            self.current = (generation, state)
+            self.condition.notify_all()
+            return generation, cells
+
+    def set_stride(self, stride):
+        with self.condition:
+            if stride != self.stride:
+                self.stride = stride
+                self._restart()
+
+    # Restart the frames at 'generation' (not before the initial grid)
+    def jump(self, generation):
+        with self.condition:
+            self._restart()
+            self.jump_target = max(generation, self.initial[0])
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def _restart(self):
+        self.epoch += 1
+        self.frames.clear()
+        self.computed = self.current
+        self.jump_target = None
+        self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed and self.jump_target is None and len(self.frames) >= self.capacity:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                epoch, target, stride = self.epoch, self.jump_target, self.stride
+                generation, state = self.computed
+                self.jump_target = None
+            if target is None:
+                target = generation + stride
+            advanced = self._advance(generation, state, target, epoch)
+            if advanced is None:
+                continue
+            generation, state = advanced
+            cells = self.engine.to_array(state)
+            with self.condition:
+                if epoch == self.epoch:
+                    self.computed = (generation, state)
+                    self.frames.append((generation, state, cells))
+                    self.condition.notify_all()
+
+    # True when the frames being computed for 'epoch' are no longer wanted
+    def _cancelled(self, epoch):
+        with self.condition:
+            return self.closed or epoch != self.epoch
+
+    # State at generation 'target', or None if the buffer was restarted or closed meanwhile
+    def _advance(self, generation, state, target, epoch):
+        if target < generation:
+            generation, state = self.initial
+        generations = target - generation
+        if hasattr(self.engine, "advance"):
+            return target, self.engine.advance(state, generations)
+        if self.hashlife_jump is not None and generations >= self.hashlife_jump:
+            return target, self._advance_hashlife(state, generations)
+        for step in range(generations):
+            if step % CANCEL_CHECK_STEPS == CANCEL_CHECK_STEPS - 1 and self._cancelled(epoch):
+                return None
+            state = self.engine.step(state)
+        return target, state
+
+    def _advance_hashlife(self, state, generations):
+        if self.hashlife is None:
+            self.hashlife = HashLifeEngine()
+        if self.hashlife_state is not None and self.hashlife_state[0] is state:
+            hashlife_state = self.hashlife_state[1]
+        else:
+            hashlife_state = self.hashlife.from_grid(self.engine.to_array(state))
+        hashlife_state = self.hashlife.advance(hashlife_state, generations)
+        state = self.engine.from_grid(self.hashlife.to_array(hashlife_state))
+        self.hashlife_state = (state, hashlife_state)
+        return state
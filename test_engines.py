@@ -0,0 +1,113 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from GeneticAlgorithm import (genetic_algorithm, fitness, batch_fitness, create_initial_population, MAX_GENERATIONS,
+                              MUTATION_RATE, GRID_SIZE)
+from LifeEngine import ENGINES, get_engine
+from Grid import to_list
+
+# Every engine and cycle detection must give the results of the list engine, the original implementation
+# Run with: python -m unittest test_engines (or python -m pytest test_engines.py)
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.json")
+REFERENCE_ENGINE = "list"
+
+
+# A random soup, the initial grid of the GA (5 cells), and the sample pattern
+def make_grids():
+    rng = np.random.default_rng(0)
+    grids = {
+        "soup": (rng.random((GRID_SIZE, GRID_SIZE)) < 0.3).astype(np.uint8).tolist(),
+        "odd_soup": (rng.random((17, 17)) < 0.4).astype(np.uint8).tolist(),
+    }
+    random.seed(1)
+    for i, grid in enumerate(create_initial_population(3, GRID_SIZE)):
+        grids[f"seed{i}"] = grid
+    with open(SAMPLE_PATH) as f:
+        grids["sample"] = json.load(f)
+    return grids
+
+
+def cycle_detections(engine_name):
+    return ["hash", "brent", "jump"] if hasattr(get_engine(engine_name), "advance") else ["hash", "brent"]
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.grids = make_grids()
+
+    def test_step(self):
+        reference = get_engine(REFERENCE_ENGINE)
+        for grid_name, grid in self.grids.items():
+            expected = [reference.from_grid(grid)]
+            for _ in range(20):
+                expected.append(reference.step(expected[-1]))
+            for engine_name in sorted(ENGINES):
+                with self.subTest(engine=engine_name, grid=grid_name):
+                    engine = get_engine(engine_name)
+                    state = engine.from_grid(grid)
+                    for generation in range(1, len(expected)):
+                        state = engine.step(state)
+                        np.testing.assert_array_equal(engine.to_array(state), reference.to_array(expected[generation]),
+                                                      err_msg=f"generation {generation}")
+                        self.assertEqual(engine.population(state), reference.population(expected[generation]))
+
+    def test_fitness(self):
+        for grid_name, grid in self.grids.items():
+            expected = fitness(grid, MAX_GENERATIONS, REFERENCE_ENGINE)
+            for engine_name in sorted(ENGINES):
+                for cycle_detection in cycle_detections(engine_name):
+                    with self.subTest(engine=engine_name, cycle_detection=cycle_detection, grid=grid_name):
+                        self.assertEqual(fitness(grid, MAX_GENERATIONS, engine_name, cycle_detection), expected)
+
+    def test_batch_fitness(self):
+        # a batch holds grids of one size
+        population = [grid for grid in self.grids.values() if np.shape(grid) == (GRID_SIZE, GRID_SIZE)]
+        expected = [fitness(grid, MAX_GENERATIONS, REFERENCE_ENGINE) for grid in population]
+        for engine_name in sorted(ENGINES):
+            if getattr(get_engine(engine_name), "batched", False):
+                with self.subTest(engine=engine_name):
+                    self.assertEqual(batch_fitness(population, MAX_GENERATIONS, engine_name), expected)
+
+
+class GeneticAlgorithmEquivalenceTest(unittest.TestCase):
+    def run_ga(self, **options):
+        return genetic_algorithm(10, GRID_SIZE, 200, 8, MUTATION_RATE, seed=1, **options)
+
+    def assertSameResults(self, result, expected):
+        self.assertEqual(to_list(result[0]), to_list(expected[0]))
+        self.assertEqual(result[1:], expected[1:])
+
+    def test_engines(self):
+        expected = self.run_ga(engine=REFERENCE_ENGINE)
+        for engine_name in sorted(ENGINES):
+            for packed in (False, True):
+                with self.subTest(engine=engine_name, packed=packed):
+                    self.assertSameResults(self.run_ga(engine=engine_name, packed=packed), expected)
+
+    def test_resume(self):
+        expected = self.run_ga()
+        with tempfile.TemporaryDirectory() as directory:
+            for stop in (1, 3, 7):
+                with self.subTest(stop=stop):
+                    path = os.path.join(directory, f"run{stop}.npz")
+                    calls = [0]
+
+                    def cancel():
+                        calls[0] += 1
+                        return calls[0] > stop
+
+                    self.run_ga(checkpoint=path, cancel=cancel)
+                    random.seed(999)
+                    result = genetic_algorithm(10, GRID_SIZE, 200, 8, MUTATION_RATE, checkpoint=path)
+                    self.assertSameResults(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()